@@ -1,14 +1,220 @@
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 from pydantic import BaseModel
 from google import genai
 from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from response_cache import ResponseCache
+from metrics import MetricsCollector, percentile
+from prefetch import CluePrefetcher, rank_candidates
+from puzzles import (
+    LazyPrompts,
+    load_clue_dictionary,
+    write_compact_puzzle,
+    write_puzzle,
+    write_sharded_puzzle,
+)
+from prompt_template import PromptTemplate
+from word_index import WordIndex
+from accents import normalize_word
+from avoid_lists import AvoidListStore, template_hash
+from repair import format_repair_stats, repair_results
+from validation import format_validation, validate_clues, write_validation_report
 import json
 import time
-import gzip
 from random import choice
 
 
+# Settings of the batches of clue prompts (Vertex jobs or realtime requests)
+# Self-play gives up after this many invalid guesses in a row
+MAX_INVALID_GUESSES = 10
+
+BATCH_SETTINGS = {
+    "temperature": 0.2,
+    "gcs_bucket": "verbiage-files",
+    "project_id": "gen-lang-client-0608167298",
+    "location": "us-central1",
+}
+
+
+def _cache_key(
+    cache, provider, prompt, model, response_model, temperature, thinking_budget
+):
+    """Return the key identifying this request in the response cache."""
+    return cache.make_key(
+        provider=provider,
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        thinking_budget=thinking_budget,
+        response_schema=(
+            None if response_model is None else response_model.model_json_schema()
+        ),
+    )
+
+
+def _format_tokens(usage: dict) -> str:
+    return (
+        f"Tokens: {usage['input_tokens']} in, "
+        f"{usage['output_tokens']} out, "
+        f"{usage['thoughts_tokens']} thoughts"
+    )
+
+
+def _report_call(on_call, start_time, usage=None, error=None, **call_info):
+    """Call ``on_call`` (if any) with the event of a finished call.
+
+    The event holds the latency in seconds, the token counts (zero for cached
+    responses and errors), the error (None if the call succeeded) and the
+    ``call_info`` (provider, model, cache status...).
+    """
+    if on_call is None:
+        return
+    usage = usage or {"input_tokens": 0, "output_tokens": 0, "thoughts_tokens": 0}
+    on_call(
+        {
+            **call_info,
+            "latency": time.perf_counter() - start_time,
+            **usage,
+            "error": error,
+        }
+    )
+
+
+def _cache_status(cache, cached_text):
+    """Cache status of a call: None without cache, else "hit" or "miss"."""
+    if cache is None:
+        return None
+    return "miss" if cached_text is None else "hit"
+
+
+class TextStream:
+    """Iterator over the text chunks of a streamed response.
+
+    Once iterated, ``text`` holds the full response and ``report()`` describes
+    the token usage, the time to first token and the total latency.
+
+    Args:
+        chunks: Iterable of (text, usage) pairs, where usage is a dict of token
+          counts (or None if the chunk doesn't provide it)
+        on_complete: Function called with the full text at the end of the stream
+        on_call: Function called with the event of the call at the end of the
+          stream (see ``_report_call``)
+        call_info: Provider, model and cache status reported to ``on_call``
+    """
+
+    def __init__(self, chunks, on_complete=None, on_call=None, call_info=None):
+        self.chunks = chunks
+        self.on_complete = on_complete
+        self.on_call = on_call
+        self.call_info = call_info or {}
+        self.parts = []
+        self.usage = None
+        self.time_to_first_token = None
+        self.latency = None
+
+    def __iter__(self):
+        start_time = time.perf_counter()
+        try:
+            for text, usage in self.chunks:
+                if usage is not None:
+                    self.usage = usage
+                if text:
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.perf_counter() - start_time
+                    self.parts.append(text)
+                    yield text
+        except Exception as error:
+            _report_call(self.on_call, start_time, error=repr(error), **self.call_info)
+            raise
+        self.latency = time.perf_counter() - start_time
+        if self.on_complete is not None:
+            self.on_complete(self.text)
+        _report_call(
+            self.on_call,
+            start_time,
+            self.usage,
+            time_to_first_token=self.time_to_first_token or self.latency,
+            **self.call_info,
+        )
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def report(self) -> str:
+        """Describe the token usage and latencies of the (consumed) stream."""
+        first_token = self.time_to_first_token or self.latency
+        report = (
+            f"Latency: {first_token:.2f}s to first token, {self.latency:.2f}s total"
+        )
+        return (
+            report if self.usage is None else f"{_format_tokens(self.usage)}. {report}"
+        )
+
+
+def _run_llm(
+    provider,
+    call,
+    stream_call,
+    prompt,
+    model,
+    response_model,
+    temperature,
+    thinking_budget,
+    cache,
+    stream,
+    on_call,
+):
+    """Get a response through ``call`` (or from the cache if provided), the
+    logic shared by ``run_gemini`` and ``run_openai``.
+
+    Args:
+        provider: Name of the provider ("gemini" or "openai")
+        call: Function without arguments querying the API, returning the
+          response text and token usage
+        stream_call: Function without arguments querying the API in streaming
+          mode, yielding (text, usage) pairs
+        Others: See ``run_gemini``
+    """
+    if stream and response_model is not None:
+        raise ValueError("Streaming is only supported for text responses")
+    start_time = time.perf_counter()
+    text = cache_key = usage = None
+    if cache is not None:
+        cache_key = _cache_key(
+            cache, provider, prompt, model, response_model, temperature, thinking_budget
+        )
+        text = cache.get(cache_key)
+    call_info = {"provider": provider, "model": model}
+    call_info["cache"] = _cache_status(cache, text)
+    if stream:
+        if text is not None:
+            return TextStream([(text, None)], on_call=on_call, call_info=call_info)
+        on_complete = None if cache is None else (lambda t: cache.set(cache_key, t))
+        return TextStream(
+            stream_call(),
+            on_complete=on_complete,
+            on_call=on_call,
+            call_info=call_info,
+        )
+    if text is None:
+        try:
+            text, usage = call()
+        except Exception as error:
+            _report_call(on_call, start_time, error=repr(error), **call_info)
+            raise
+        if cache is not None:
+            cache.set(cache_key, text)
+    _report_call(on_call, start_time, usage, **call_info)
+    if response_model is not None:
+        return response_model.model_validate_json(text)
+    else:
+        return text
+
+
 def run_gemini(
     prompt,
     model="gemini-2.5-flash",
@@ -16,36 +222,83 @@ def run_gemini(
     temperature: float = 0.0,
     debug: bool = False,
     thinking_budget: int = None,
-) -> BaseModel | str:
-    """Get a response from the Gemini API"""
-    client = genai.Client()
+    cache: Optional[ResponseCache] = None,
+    client: Optional[genai.Client] = None,
+    stream: bool = False,
+    on_call: Optional[Callable[[dict], None]] = None,
+) -> BaseModel | str | TextStream:
+    """Get a response from the Gemini API (or from the cache if provided)
+
+    A new client is created for the call unless one is provided. With
+    ``stream=True`` (text responses only), a TextStream yielding the text as it
+    arrives is returned. If provided, ``on_call`` is called at the end of the
+    call with its event (provider, model, cache status, latency,
+    input/output/thoughts tokens, error), e.g. ``MetricsCollector.record``.
+    """
+    return _run_llm(
+        "gemini",
+        lambda: _call_gemini(
+            prompt, model, response_model, temperature, debug, thinking_budget, client
+        ),
+        lambda: _stream_gemini(prompt, model, temperature, thinking_budget, client),
+        prompt,
+        model,
+        response_model,
+        temperature,
+        thinking_budget,
+        cache,
+        stream,
+        on_call,
+    )
+
+
+def _gemini_config(response_model, temperature, thinking_budget):
+    """Return the generation config of a Gemini request"""
     params = {"temperature": temperature}
     if thinking_budget is not None:
         tk_config = genai.types.ThinkingConfig(thinking_budget=thinking_budget)
         params["thinking_config"] = tk_config
     if response_model is not None:
-        config = genai.types.GenerateContentConfig(
+        return genai.types.GenerateContentConfig(
             response_mime_type="application/json",
             response_schema=response_model.model_json_schema(),
             **params,
         )
-    else:
-        config = genai.types.GenerateContentConfig(
-            response_mime_type="text/plain", **params
-        )
+    return genai.types.GenerateContentConfig(response_mime_type="text/plain", **params)
+
+
+def _gemini_usage(usage) -> dict:
+    return {
+        "input_tokens": usage.prompt_token_count or 0,
+        "output_tokens": usage.candidates_token_count or 0,
+        "thoughts_tokens": usage.thoughts_token_count or 0,
+    }
+
+
+def _call_gemini(
+    prompt, model, response_model, temperature, debug, thinking_budget, client=None
+):
+    """Query the Gemini API and return the raw response text and token usage"""
+    if client is None:
+        client = genai.Client()
+    config = _gemini_config(response_model, temperature, thinking_budget)
     resp = client.models.generate_content(model=model, contents=prompt, config=config)
-    usage = resp.usage_metadata
+    usage = _gemini_usage(resp.usage_metadata)
     if debug:
-        print(
-            f"Tokens: {usage.prompt_token_count} in, "
-            f"{usage.candidates_token_count} out, "
-            f"{usage.thoughts_token_count} thoughts"
-        )
-    text = resp.candidates[0].content.parts[0].text
-    if response_model is not None:
-        return response_model.model_validate_json(text)
-    else:
-        return text
+        print(_format_tokens(usage))
+    return resp.candidates[0].content.parts[0].text, usage
+
+
+def _stream_gemini(prompt, model, temperature, thinking_budget, client=None):
+    """Query the Gemini API in streaming mode, yielding (text, usage) pairs"""
+    if client is None:
+        client = genai.Client()
+    config = _gemini_config(None, temperature, thinking_budget)
+    for chunk in client.models.generate_content_stream(
+        model=model, contents=prompt, config=config
+    ):
+        usage = chunk.usage_metadata
+        yield chunk.text or "", None if usage is None else _gemini_usage(usage)
 
 
 def run_openai(
@@ -55,9 +308,43 @@ def run_openai(
     temperature: float = 0.0,
     debug: bool = False,
     thinking_budget: int = None,
-) -> BaseModel | str:
-    """Get a response from the OpenAI API"""
-    client = OpenAI()
+    cache: Optional[ResponseCache] = None,
+    client: Optional[OpenAI] = None,
+    stream: bool = False,
+    on_call: Optional[Callable[[dict], None]] = None,
+) -> BaseModel | str | TextStream:
+    """Get a response from the OpenAI API (or from the cache if provided)
+
+    Same parameters as ``run_gemini`` (``thinking_budget`` is not used).
+    """
+    return _run_llm(
+        "openai",
+        lambda: _call_openai(prompt, model, response_model, temperature, debug, client),
+        lambda: _stream_openai(prompt, model, temperature, client),
+        prompt,
+        model,
+        response_model,
+        temperature,
+        thinking_budget,
+        cache,
+        stream,
+        on_call,
+    )
+
+
+def _openai_usage(usage) -> dict:
+    details = usage.completion_tokens_details
+    return {
+        "input_tokens": usage.prompt_tokens or 0,
+        "output_tokens": usage.completion_tokens or 0,
+        "thoughts_tokens": (details and details.reasoning_tokens) or 0,
+    }
+
+
+def _call_openai(prompt, model, response_model, temperature, debug, client=None):
+    """Query the OpenAI API and return the raw response text and token usage"""
+    if client is None:
+        client = OpenAI()
 
     messages = [{"role": "user", "content": prompt}]
 
@@ -83,24 +370,164 @@ def run_openai(
             temperature=temperature,
         )
 
+    usage = _openai_usage(completion.usage)
     if debug:
-        usage = completion.usage
-        print(f"Tokens: {usage.prompt_tokens} in, {usage.completion_tokens} out")
+        print(_format_tokens(usage))
 
-    text = completion.choices[0].message.content
+    return completion.choices[0].message.content, usage
 
-    if response_model is not None:
-        return response_model.model_validate_json(text)
-    else:
-        return text
+
+def _stream_openai(prompt, model, temperature, client=None):
+    """Query the OpenAI API in streaming mode, yielding (text, usage) pairs"""
+    if client is None:
+        client = OpenAI()
+    chunks = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in chunks:
+        text = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+        yield text, None if chunk.usage is None else _openai_usage(chunk.usage)
+
+
+def format_calls_summary(calls_by_category: dict[str, list[dict]], wall_time):
+    """Return a table of latency percentiles and token totals per category.
+
+    Args:
+        calls_by_category: {category: [call statistics]} as reported by the
+          ``on_call`` callbacks of ``run_gemini`` and ``run_openai``
+        wall_time: Total duration of the run in seconds
+    """
+    rows = [("", "calls", "p50 (s)", "p95 (s)", "in tok", "out tok", "thoughts")]
+    all_calls = [call for calls in calls_by_category.values() for call in calls]
+    for category, calls in [*calls_by_category.items(), ("total", all_calls)]:
+        latencies = [call["latency"] for call in calls]
+        rows.append(
+            (
+                category,
+                str(len(calls)),
+                f"{percentile(latencies, 50):.2f}",
+                f"{percentile(latencies, 95):.2f}",
+                *[
+                    str(sum(call[key] for call in calls))
+                    for key in ("input_tokens", "output_tokens", "thoughts_tokens")
+                ],
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = [
+        "  ".join(
+            [row[0].ljust(widths[0])]
+            + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        )
+        for row in rows
+    ]
+    return "\n".join(lines + [f"Wall-clock time: {wall_time:.1f}s"])
 
 
-def format_template(template_path: Path, **kwargs):
-    """Format a template with the given kwargs"""
-    template = template_path.read_text()
-    for key, value in kwargs.items():
-        template = template.replace(f"{{{{{key}}}}}", value)
-    return template
+def _chain_callbacks(*callbacks):
+    """Return a callback calling all the given callbacks (None are skipped)."""
+    callbacks = [callback for callback in callbacks if callback is not None]
+
+    def chained(event):
+        for callback in callbacks:
+            callback(event)
+
+    return chained
+
+
+def _strip_code_fence(text: str) -> str:
+    """Return the content of a ```json ... ``` block, or the text itself."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    return text
+
+
+class LLMProvider(ABC):
+    """Runs prompts through an LLM API, reusing one client for the session.
+
+    The client (and its pool of keep-alive HTTP connections) is created on the
+    first call and shared by all the following calls, including concurrent ones.
+
+    Args:
+        cache: Optional cache of responses, checked before calling the API
+        metrics: Optional collector recording an event for every call
+        client_kwargs: Keyword arguments for the client constructor (e.g. to
+          point it at another endpoint)
+    """
+
+    name = None
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        **client_kwargs,
+    ):
+        self.cache = cache
+        self.metrics = metrics
+        self.client_kwargs = client_kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The client of the session, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+
+    @abstractmethod
+    def _create_client(self):
+        """Return a new client of the API."""
+
+    @abstractmethod
+    def _run(self, prompt, **kwargs):
+        """Run a prompt with the client (``run_gemini``, ``run_openai``...)."""
+
+    def __call__(self, prompt, on_call=None, **kwargs) -> BaseModel | str:
+        """Get a response, with the same parameters as ``run_gemini``."""
+        if self.metrics is not None:
+            on_call = _chain_callbacks(on_call, self.metrics.record)
+        return self._run(
+            prompt, cache=self.cache, client=self.client, on_call=on_call, **kwargs
+        )
+
+    def close(self):
+        """Close the client and its connections (a new one opens if needed)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class GeminiProvider(LLMProvider):
+    """Session-scoped provider for the Gemini API."""
+
+    name = "gemini"
+
+    def _create_client(self):
+        return genai.Client(**self.client_kwargs)
+
+    def _run(self, prompt, **kwargs):
+        return run_gemini(prompt, **kwargs)
+
+
+class OpenAIProvider(LLMProvider):
+    """Session-scoped provider for the OpenAI API."""
+
+    name = "openai"
+
+    def _create_client(self):
+        return OpenAI(**self.client_kwargs)
+
+    def _run(self, prompt, **kwargs):
+        return run_openai(prompt, **kwargs)
 
 
 class VerbiageGame:
@@ -108,12 +535,23 @@ class VerbiageGame:
     A unified game class that handles both English and French word guessing games.
     """
 
-    def __init__(self, language: str = "en", debug: bool = False):
+    def __init__(
+        self,
+        language: str = "en",
+        debug: bool = False,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        avoid_lists: Optional[AvoidListStore] = None,
+    ):
         """
         Initialize the game with the specified language.
 
         Args:
             language: "en" for English or "fr" for French
+            cache: Optional cache of LLM responses, shared by all calls of the game
+            metrics: Optional collector of the events of all the LLM calls
+            avoid_lists: Optional store of the things to avoid of the secret
+              words, read before generating them and updated after
         """
         if language not in ["en", "fr"]:
             raise ValueError("Language must be 'en' or 'fr'")
@@ -123,12 +561,28 @@ class VerbiageGame:
         self.prompts_path = dir / "instructions" / language
         self.words_path = dir / "word_lists" / language / f"{language}_words.json"
 
-        # Load words data
-        self.all_words = json.loads(self.words_path.read_text())
+        # Words are loaded lazily, one size at a time
+        self.word_index = WordIndex(language)
+
+        # Parse the prompt templates once for the whole session
+        self.templates = {
+            path.stem: PromptTemplate.from_file(path)
+            for path in self.prompts_path.glob("*.md")
+        }
+
+        # Stored avoid lists are only reused for the same template
+        self.avoid_template_hash = template_hash(self.templates["things_to_avoid"].text)
 
         # Language-specific configurations
         self._setup_language_config()
         self.debug = debug
+        self.cache = cache
+        self.metrics = metrics
+        self.avoid_lists = avoid_lists
+        self.providers = {}
+        self._providers_lock = threading.Lock()
+        self.repair_summaries = []
+        self.validation_summaries = []
 
     def debug_print(self, message):
         """Print a message if debug is enabled."""
@@ -157,8 +611,9 @@ class VerbiageGame:
                     "checking": "🔍 Checking...",
                     "test_word_prefix": "THE WORD is {}",
                 },
+                # How the clues must refer to the secret word
+                "clue_placeholder": r"\bTHE WORD(?:S|s)?\b",
                 "has_accents": False,
-                "case_conversion": lambda x: x.upper(),
             }
         else:  # French
             self.config = {
@@ -180,8 +635,8 @@ class VerbiageGame:
                     "checking": "🔍 Vérification...",
                     "test_word_prefix": "LE MOT est {}",
                 },
+                "clue_placeholder": r"\bMOT(?:S|s)?\b",  # LE MOT, DU MOT...
                 "has_accents": True,
-                "case_conversion": lambda x: x.upper(),
             }
 
     def _create_english_response_model(self):
@@ -202,7 +657,12 @@ class VerbiageGame:
 
         return MotsAEviter
 
-    def ai_play(self, clues, model, word_size, thinking_budget):
+    def ai_play(
+        self, clues, model, word_size, thinking_budget, on_call=None, rejected=()
+    ):
+        """Ask the model for a guess. The ``rejected`` guesses (not in the word
+        list) are listed in the prompt, so that the next prompt differs and
+        isn't answered with the same guess (e.g. from the response cache)."""
         client = self.get_client(model)
         clues = ". ".join(clues) if len(clues) > 0 else ""
         prompt = (
@@ -214,27 +674,47 @@ class VerbiageGame:
             f"Important: your answer should be a single {word_size}-letter word, "
             f"without formatting, for instance APPLE, DREAM, HORSE, etc."
         )
+        if rejected:
+            prompt += (
+                f"\nThese answers are not valid words, don't give them again: "
+                f"{', '.join(rejected)}."
+            )
         return client(
             prompt,
             temperature=0.2,
             model=model,
             debug=self.debug,
             thinking_budget=thinking_budget,
+            on_call=on_call,
         )
 
     def get_client(self, model):
-        """Get the appropriate AI client based on the model."""
-        return run_gemini if model.startswith("gemini") else run_openai
+        """Get the provider of the game for this model (created on first use)."""
+        provider_class = (
+            GeminiProvider if model.startswith("gemini") else OpenAIProvider
+        )
+        # Concurrent games (see ``evaluation``) must share a single provider
+        with self._providers_lock:
+            if provider_class.name not in self.providers:
+                self.providers[provider_class.name] = provider_class(
+                    cache=self.cache, metrics=self.metrics
+                )
+            return self.providers[provider_class.name]
+
+    def close(self):
+        """Close the connections of all the providers used by the game."""
+        for provider in self.providers.values():
+            provider.close()
 
     def get_random_word(self, words):
         """Get a random word from the drawable words."""
         print(self.config["messages"]["picking_word"])
-        return choice(words["drawable"])
+        return choice(words.drawable)
 
     def get_accented_dict(self):
         """Get the accented dictionary for French, or empty dict for English."""
         if self.config["has_accents"]:
-            return self.all_words.get("accented_dict", {})
+            return self.word_index.accented
         return {}
 
     def get_word_with_accents(self, word):
@@ -244,20 +724,149 @@ class VerbiageGame:
             return accented_dict.get(word, word)
         return word
 
-    def generate_things_to_avoid(self, word, model):
-        """Generate things to avoid for the given word."""
+    def generate_things_to_avoid(self, word, model, on_call=None):
+        """Generate things to avoid for the given word.
+
+        With an avoid list store, the stored list of the word is returned if
+        there is one for this model and template, else the new list is stored.
+        """
         response_model = self.config["response_model_class"]
-        things_to_avoid_prompt = format_template(
-            self.prompts_path / "things_to_avoid.md", word=word
-        )
+        if self.avoid_lists is not None:
+            stored = self.avoid_lists.get(
+                self.language, word, model, self.avoid_template_hash
+            )
+            if stored is not None:
+                self.debug_print(f"Using the stored things to avoid of {word}")
+                return response_model.model_validate(stored)
+        things_to_avoid_prompt = self.templates["things_to_avoid"].render(word=word)
         client = self.get_client(model)
-        return client(
+        things_to_avoid = client(
             things_to_avoid_prompt,
             response_model=response_model,
             temperature=0.4,
             model=model,
             thinking_budget=None,
+            on_call=on_call,
+        )
+        if self.avoid_lists is not None:
+            self.avoid_lists.set(
+                self.language,
+                model,
+                self.avoid_template_hash,
+                {word: things_to_avoid.model_dump()},
+            )
+        return things_to_avoid
+
+    def pregenerate_things_to_avoid(
+        self, word_sizes=None, model="gemini-2.5-flash", batch_function=None, **kwargs
+    ):
+        """Generate the things to avoid of all the drawable words in one batch,
+        and add them to the avoid list store.
+
+        Only the words without a stored list for this model and template are
+        sent. Unparsable responses are reported and left missing, so a rerun
+        only sends these words again.
+
+        Args:
+            word_sizes: Sizes of the drawable words (default: all sizes)
+            model: The model to use
+            batch_function: ``gemini_batch`` or ``realtime_batch``
+            **kwargs: Other parameters of the batch function (manifest...)
+
+        Returns:
+            The number of words generated, and of words that failed
+        """
+        if self.avoid_lists is None:
+            raise ValueError("An avoid list store is required to pregenerate lists")
+        if batch_function is None:
+            raise ValueError("batch_function is required for batch generation")
+        words = list(
+            dict.fromkeys(  # Unique words, in the order of the lists
+                self.get_word_with_accents(word)
+                for size in word_sizes or self.word_index.sizes
+                for word in self.word_index[size].drawable
+            )
+        )
+        missing = self.avoid_lists.missing(
+            self.language, words, model, self.avoid_template_hash
+        )
+        print(f"{len(words) - len(missing)} stored avoid lists, {len(missing)} to go")
+        if not missing:
+            return {"generated": 0, "failed": 0}
+
+        template = self.templates["things_to_avoid"]
+        prompts = {word: template.render(word=word) for word in missing}
+        results, _job = batch_function(
+            prompts,
+            model=model,
+            thinking_budget=None,
+            **{**BATCH_SETTINGS, "temperature": 0.4},
+            **kwargs,
+        )
+        response_model = self.config["response_model_class"]
+        things_to_avoid_by_word = {}
+        for word, response in results.items():
+            try:
+                things_to_avoid_by_word[word] = response_model.model_validate_json(
+                    _strip_code_fence(response)
+                ).model_dump()
+            except ValueError:
+                self.debug_print(f"Unparsable things to avoid for {word}: {response}")
+        self.avoid_lists.set(
+            self.language, model, self.avoid_template_hash, things_to_avoid_by_word
         )
+        failed = len(missing) - len(things_to_avoid_by_word)
+        return {"generated": len(things_to_avoid_by_word), "failed": failed}
+
+    def get_word_response_template(self, word_with_accents, things_to_avoid):
+        """Return the clue prompt for this secret word, to be rendered with the
+        ``player_word``."""
+        return self.templates["word_response"].partial(
+            secret_word=word_with_accents,
+            avoid=", ".join(getattr(things_to_avoid, self.config["avoid_field"])),
+            advice=getattr(things_to_avoid, self.config["advice_field"]),
+        )
+
+    def get_clue_function(
+        self, word, model, thinking_budget=None, on_call=None, quiet=False
+    ):
+        """Generate the things to avoid for this secret word and return a
+        function ``get_clue(guess, debug=..., stream=..., on_call=...)``
+        generating clues.
+
+        ``on_call`` is called with the event of each LLM call (see
+        ``run_gemini``), unless ``get_clue`` is given another one (e.g. by
+        games sharing the function). With ``quiet``, the progress message is not printed
+        (e.g. for concurrent games)."""
+        if not quiet:
+            print(self.config["messages"]["generating_advice"])
+        word_with_accents = self.get_word_with_accents(word)
+        things_to_avoid = self.generate_things_to_avoid(
+            word_with_accents, model, on_call=on_call
+        )
+        self.debug_print(
+            f"Things to avoid: {getattr(things_to_avoid, self.config['avoid_field'])}"
+        )
+
+        client = self.get_client(model)
+        word_response_template = self.get_word_response_template(
+            word_with_accents, things_to_avoid
+        )
+
+        def get_clue(guess, debug=self.debug, stream=False, on_call=on_call):
+            return client(
+                word_response_template.render(
+                    player_word=self.get_word_with_accents(guess)
+                ),
+                temperature=0.2,
+                model=model,
+                debug=debug,
+                thinking_budget=thinking_budget,
+                stream=stream,
+                on_call=on_call,
+            )
+
+        return get_clue
 
     def play(
         self,
@@ -266,173 +875,445 @@ class VerbiageGame:
         model="gemini-2.5-flash",
         thinking_budget=None,
         self_play=False,
+        prefetch_budget=0,
+        puzzle=None,
+        stream=False,
     ):
-        """Play the interactive word guessing game."""
-        words = self.all_words[str(word_size)]
+        """Play the interactive word guessing game.
+
+        If ``prefetch_budget`` is positive, up to that many clues are generated
+        in the background for likely guesses while waiting for the player.
+        If a ``puzzle`` ({guess: clue, "solution": word}, as written by
+        ``generate_batch``) is provided, its solution is the secret word and the
+        clues are read from it instead of generated. With ``stream=True``, the
+        generated clues are printed as they arrive.
+        """
+        if puzzle is not None:
+            word = puzzle["solution"]
+            word_size = len(word)
+        words = self.word_index[word_size]
 
         if word is None:
             word = self.get_random_word(words)
             self.debug_print(self.config["messages"]["secret_word"].format(word))
-        else:
+        elif puzzle is None:
             print(self.config["messages"]["using_word"].format(word))
+        else:
+            self.debug_print(self.config["messages"]["secret_word"].format(word))
 
-        print(self.config["messages"]["generating_advice"])
-        word_with_accents = self.get_word_with_accents(word)
-        things_to_avoid = self.generate_things_to_avoid(word_with_accents, model)
-        self.debug_print(
-            f"Things to avoid: {getattr(things_to_avoid, self.config['avoid_field'])}"
-        )
+        if puzzle is None:
+            get_clue = self.get_clue_function(word, model, thinking_budget)
+        else:
 
-        client = self.get_client(model)
-        word_response_prompt = format_template(
-            self.prompts_path / "word_response.md",
-            secret_word=word_with_accents,
-            avoid=", ".join(getattr(things_to_avoid, self.config["avoid_field"])),
-            advice=getattr(things_to_avoid, self.config["advice_field"]),
-        )
+            def get_clue(guess, debug=False, stream=False):
+                return puzzle[guess]
+
+        prefetcher = None
+        if prefetch_budget and puzzle is None:
+            candidates = rank_candidates(
+                words.playable,
+                words.drawable,
+                self.word_index.frequencies(word_size),
+            )
+            prefetcher = CluePrefetcher(
+                generate_clue=lambda guess: get_clue(guess, debug=False),
+                candidates=[w for w in candidates if w != word],
+                budget=prefetch_budget,
+            )
 
         print(self.config["messages"]["lets_play"])
         clues = []
+        rejected = []  # Invalid guesses of the model since the last valid one
 
-        while True:
-            if self_play:
-                player_word = self.ai_play(clues, model, word_size, thinking_budget)
-                print(f"🤖 {player_word}")
-            else:
-                player_word = input(self.config["messages"]["input_prompt"])
-            if self.config["has_accents"]:
-                player_word = player_word.upper()
-
-            if player_word == self.config["messages"]["quit_command"]:
-                print(self.config["messages"]["quit_message"].format(word))
-                break
-
-            if len(player_word) == 0:
-                continue
-
-            if len(player_word) != len(word):
-                print(self.config["messages"]["length_warning"].format(len(word)))
-                continue
-
-            normalized_word = self.config["case_conversion"](player_word)
-            if normalized_word not in words["playable"]:
-                print(self.config["messages"]["not_in_list"].format(normalized_word))
-                continue
-
-            if normalized_word == word:
-                print(self.config["messages"]["win_message"])
-                break
-
-            print(self.config["messages"]["checking"])
-            player_word_with_accents = self.get_word_with_accents(normalized_word)
-            response = client(
-                word_response_prompt.replace(
-                    "{{player_word}}", player_word_with_accents
-                ),
-                temperature=0.2,
-                model=model,
-                debug=self.debug,
-                thinking_budget=thinking_budget,
-            )
-            clues.append(response)
-            print(f"\n🗣️ {response}\n")
+        try:
+            while True:
+                if prefetcher is not None:
+                    prefetcher.resume()
+                if self_play:
+                    if len(rejected) >= MAX_INVALID_GUESSES:
+                        print(self.config["messages"]["quit_message"].format(word))
+                        break
+                    player_word = self.ai_play(
+                        clues, model, word_size, thinking_budget, rejected=rejected
+                    )
+                    print(f"🤖 {player_word}")
+                else:
+                    player_word = input(self.config["messages"]["input_prompt"])
+                if prefetcher is not None:
+                    prefetcher.pause()
+                if self.config["has_accents"]:
+                    player_word = player_word.upper()
+
+                if player_word == self.config["messages"]["quit_command"]:
+                    print(self.config["messages"]["quit_message"].format(word))
+                    break
+
+                normalized_word = normalize_word(player_word)
+                if len(normalized_word) == 0:
+                    rejected.append(repr(player_word))
+                    continue
+
+                if len(normalized_word) != len(word):
+                    print(self.config["messages"]["length_warning"].format(len(word)))
+                    rejected.append(normalized_word)
+                    continue
+
+                if normalized_word not in words.playable_set or (
+                    puzzle is not None and normalized_word not in puzzle
+                ):
+                    print(
+                        self.config["messages"]["not_in_list"].format(normalized_word)
+                    )
+                    rejected.append(normalized_word)
+                    continue
+                rejected.clear()
+
+                if normalized_word == word:
+                    print(self.config["messages"]["win_message"])
+                    break
+
+                response = None
+                if prefetcher is not None:
+                    response = prefetcher.get(normalized_word)
+                if response is None:
+                    print(self.config["messages"]["checking"])
+                    response = get_clue(normalized_word, stream=stream)
+                if isinstance(response, TextStream):
+                    print("\n🗣️ ", end="", flush=True)
+                    for chunk in response:
+                        print(chunk, end="", flush=True)
+                    print("\n")
+                    self.debug_print(response.report())
+                    response = response.text
+                else:
+                    print(f"\n🗣️ {response}\n")
+                if prefetcher is not None:
+                    prefetcher.remember(normalized_word, response)
+                clues.append(response)
+        finally:
+            if prefetcher is not None:
+                prefetcher.stop()
+                print(prefetcher.summary())
+
+    def run_tests(
+        self,
+        model="gemini-2.5-flash",
+        word=None,
+        thinking_budget=None,
+        max_workers=8,
+    ):
+        """Run tests on a series of words.
 
-    def run_tests(self, model="gemini-2.5-flash", word=None, thinking_budget=None):
-        """Run tests on a series of words."""
-        test_words = json.loads((self.prompts_path / "test_words.json").read_text())
+        The LLM calls run concurrently on ``max_workers`` threads, but the clues
+        are printed in the order of the test words. A summary of the latencies
+        and token counts of the calls is printed at the end.
+        """
+        test_words_path = self.words_path.parent / "test_words.json"
+        test_words = json.loads(test_words_path.read_text())
         client = self.get_client(model)
 
         if word is not None:
             test_words = {word: test_words[word]}
 
-        for word, guesses in test_words.items():
-            print(f"\n{self.config['messages']['test_word_prefix'].format(word)}")
+        calls = {"things to avoid": [], "clues": []}
+        start_time = time.perf_counter()
+
+        def get_template(word):
             word_with_accents = self.get_word_with_accents(word)
-            things_to_avoid = self.generate_things_to_avoid(word_with_accents, model)
-            word_response_prompt = format_template(
-                self.prompts_path / "word_response.md",
-                secret_word=word_with_accents,
-                avoid=", ".join(getattr(things_to_avoid, self.config["avoid_field"])),
-                advice=getattr(things_to_avoid, self.config["advice_field"]),
+            things_to_avoid = self.generate_things_to_avoid(
+                word_with_accents, model, on_call=calls["things to avoid"].append
             )
-            for guess in guesses:
-                guess_with_accents = self.get_word_with_accents(guess)
-                response = client(
-                    word_response_prompt.replace("{{player_word}}", guess_with_accents),
-                    temperature=0.2,
-                    model=model,
-                    debug=self.debug,
-                    thinking_budget=thinking_budget,
-                )
-                print(response)
+            return self.get_word_response_template(word_with_accents, things_to_avoid)
 
-    def generate_batch(
+        def get_clue(template_future, guess):
+            guess_with_accents = self.get_word_with_accents(guess)
+            return client(
+                template_future.result().render(player_word=guess_with_accents),
+                temperature=0.2,
+                model=model,
+                thinking_budget=thinking_budget,
+                debug=self.debug,
+                on_call=calls["clues"].append,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # All templates are submitted before the clues waiting for them, so a
+            # clue task never blocks a worker on a template task still queued.
+            templates = {w: executor.submit(get_template, w) for w in test_words}
+            clues = {
+                word: [executor.submit(get_clue, templates[word], g) for g in guesses]
+                for word, guesses in test_words.items()
+            }
+            for word, clue_futures in clues.items():
+                print(f"\n{self.config['messages']['test_word_prefix'].format(word)}")
+                for clue_future in clue_futures:
+                    print(clue_future.result())
+
+        print()
+        print(format_calls_summary(calls, time.perf_counter() - start_time))
+
+    def prepare_batch(
         self,
         word_size=5,
         model="gemini-2.5-flash",
         word=None,
-        output_file=None,
-        thinking_budget=None,
-        batch_function=None,
         max_words=None,
         words_to_exclude=None,
+        date=None,
+        manifest=None,
     ):
-        """Generate batch responses for all playable words."""
-        if batch_function is None:
-            raise ValueError("batch_function is required for batch generation")
+        """Pick the secret word and build the clue prompts of a puzzle.
 
-        start_time = time.time()
-        words = self.all_words[str(word_size)]
+        If the job ``manifest`` has a job for the puzzle of this ``date``, its
+        secret word and things to avoid are reused, so that the prompts are the
+        same and the job is resumed rather than submitted again.
+
+        Returns:
+            A tuple (prompts_by_word, job_info) where job_info holds the
+            language, date, word size, solution and things to avoid
+        """
+        words = self.word_index[word_size]
+        response_model = self.config["response_model_class"]
+
+        things_to_avoid = None
+        if manifest is not None and date is not None and word is None:
+            previous_jobs = manifest.puzzles(
+                language=self.language, date=date, word_size=word_size
+            )
+            if previous_jobs:
+                print(f"Resuming the puzzle of {date} from the job manifest")
+                word = previous_jobs[0]["solution"]
+                things_to_avoid = response_model.model_validate(
+                    previous_jobs[0]["things_to_avoid"]
+                )
 
         if word is None:
-            list_of_words = words["drawable"]
+            list_of_words = words.drawable
             if words_to_exclude is not None:
+                words_to_exclude = set(words_to_exclude)
                 list_of_words = [w for w in list_of_words if w not in words_to_exclude]
             word = choice(list_of_words)
 
-        print("Generating words to avoid")
         word_with_accents = self.get_word_with_accents(word)
-        things_to_avoid = self.generate_things_to_avoid(word_with_accents, model)
+        if things_to_avoid is None:
+            print("Generating words to avoid")
+            things_to_avoid = self.generate_things_to_avoid(word_with_accents, model)
 
+        job_info = {
+            "language": self.language,
+            "date": date,
+            "word_size": word_size,
+            "solution": word,
+            "things_to_avoid": things_to_avoid.model_dump(),
+        }
         print("Generating word responses")
-        word_response_prompt = format_template(
-            self.prompts_path / "word_response.md",
-            secret_word=word_with_accents,
-            avoid=", ".join(getattr(things_to_avoid, self.config["avoid_field"])),
-            advice=getattr(things_to_avoid, self.config["advice_field"]),
-        )
+        prompts_by_word = self.puzzle_prompts(job_info, max_words=max_words)
+        return prompts_by_word, job_info
 
-        words_for_clues = words["playable"]
+    def puzzle_prompts(self, job_info, max_words=None):
+        """Return the clue prompts {guess: prompt} of a puzzle, from its
+        ``job_info`` (as returned by ``prepare_batch``). The prompts are
+        rendered when read (see ``puzzles.LazyPrompts``)."""
+        response_model = self.config["response_model_class"]
+        things_to_avoid = response_model.model_validate(job_info["things_to_avoid"])
+        word_response_template = self.get_word_response_template(
+            self.get_word_with_accents(job_info["solution"]), things_to_avoid
+        )
+        words_for_clues = self.word_index[job_info["word_size"]].playable
         if max_words is not None:
             words_for_clues = words_for_clues[:max_words]
+        return LazyPrompts(
+            words_for_clues,
+            lambda word: word_response_template.render(
+                player_word=self.get_word_with_accents(word)
+            ),
+        )
+
+    def validate_puzzle_clues(
+        self,
+        results,
+        job_info,
+        prompts,
+        model="gemini-2.5-flash",
+        thinking_budget=None,
+        batch_function=None,
+        regenerate=True,
+    ):
+        """Check the clues of a puzzle, and regenerate the flagged ones.
 
-        prompts_by_word = {
-            word: word_response_prompt.replace(
-                "{{player_word}}", self.get_word_with_accents(word)
+        The clues leaking the secret word or an avoid term, missing the
+        placeholder of the secret word, or longer than one sentence are
+        flagged (see ``validation.ClueValidator``). With ``regenerate``, their
+        prompts are run again (see ``repair.repair_results``), and a new clue
+        replaces the old one in ``results`` if it passes the checks.
+
+        Args:
+            results: The {guess: clue} clues of the puzzle (updated)
+            job_info: The puzzle information returned by ``prepare_batch``
+            prompts: The {guess: prompt} prompts of the clues
+
+        Returns:
+            The validation report of the final clues, with the number of clues
+            flagged before regeneration and of clues regenerated
+        """
+        solution = job_info["solution"]
+        avoid = job_info["things_to_avoid"][self.config["avoid_field"]]
+
+        def validate(clues):
+            return validate_clues(
+                clues, solution, avoid, self.config["clue_placeholder"]
             )
-            for word in words_for_clues
-        }
 
-        results, _job = batch_function(
-            prompts_by_word,
-            model=model,
-            temperature=0.2,
-            gcs_bucket="verbiage-files",
-            project_id="gen-lang-client-0608167298",
-            location="us-central1",
-            thinking_budget=thinking_budget,
+        report = validate(results)
+        flagged = [guess for guess in report["flagged"] if guess in prompts]
+        regenerated = 0
+        if regenerate and flagged:
+            print(f"Regenerating {len(flagged)} flagged clues")
+            new_results = {guess: "" for guess in flagged}
+            repair_options = {}
+            if batch_function is not None:
+                repair_options["batch_function"] = batch_function
+            repair_results(
+                new_results,
+                {guess: prompts[guess] for guess in flagged},
+                model=model,
+                thinking_budget=thinking_budget,
+                max_rounds=1,
+                **repair_options,
+                **BATCH_SETTINGS,
+            )
+            new_report = validate(new_results)
+            for guess, clue in new_results.items():
+                if clue.strip() and guess not in new_report["flagged"]:
+                    results[guess] = clue
+                    regenerated += 1
+            report = validate(results)
+        report["flagged_before_regeneration"] = len(flagged)
+        report["regenerated"] = regenerated
+        self.validation_summaries.append(
+            format_validation(report, f"{self.language} {solution}")
         )
-        results["solution"] = word
+        return report
+
+    def generate_batch(
+        self,
+        word_size=5,
+        model="gemini-2.5-flash",
+        word=None,
+        output_file=None,
+        thinking_budget=None,
+        batch_function=None,
+        max_words=None,
+        words_to_exclude=None,
+        date=None,
+        manifest=None,
+        deadline=None,
+        repair=True,
+        shards=None,
+        validate=True,
+    ):
+        """Generate batch responses for all playable words.
+
+        With a job ``manifest`` (Vertex batches only), the job of the puzzle of
+        this ``date`` is recorded with its secret word and things to avoid, so
+        a rerun after a crash rebuilds the same prompts and resumes the job
+        instead of submitting a new one. ``deadline`` is the maximum number of
+        seconds to wait for the job.
+
+        With ``repair``, the prompts with a failed or empty result are run
+        again (see ``repair.repair_results``) before the puzzle is written.
+        An ``output_file`` ending with .vbp is written in the compact format
+        (see ``puzzles.encode_compact_puzzle``). With a number of ``shards``,
+        the puzzle is written as shards plus a header, in a directory named
+        after the output file (see ``puzzles.write_sharded_puzzle``).
+
+        With ``validate``, the clues are checked and the flagged ones run again
+        (see ``validate_puzzle_clues``), and the validation report is written
+        in .cache/validation_reports (see ``validation.write_validation_report``).
+
+        Returns:
+            The puzzle {guess: clue, ..., "solution": word}
+        """
+        if batch_function is None:
+            raise ValueError("batch_function is required for batch generation")
 
         if output_file is None:
             output_file = f"batch_{model}_{word_size}.json"
         output_file = Path(output_file)
+        # Fail before paying for the batch if the compact file can't be written
+        zdict = None
+        if not shards and output_file.suffix == ".vbp":
+            zdict = load_clue_dictionary(self.language)
+
+        start_time = time.time()
+        prompts_by_word, job_info = self.prepare_batch(
+            word_size=word_size,
+            model=model,
+            word=word,
+            max_words=max_words,
+            words_to_exclude=words_to_exclude,
+            date=date,
+            manifest=manifest,
+        )
+
+        job_options = {}
+        if manifest is not None:
+            job_options = {
+                "manifest": manifest,
+                "poll_deadline": deadline,
+                "job_info": job_info,
+            }
+
+        results, _job = batch_function(
+            prompts_by_word,
+            model=model,
+            thinking_budget=thinking_budget,
+            **BATCH_SETTINGS,
+            **job_options,
+        )
+        if repair:
+            repair_stats = repair_results(
+                results,
+                prompts_by_word,
+                model=model,
+                thinking_budget=thinking_budget,
+                batch_function=batch_function,
+                **BATCH_SETTINGS,
+            )
+            name = f"{self.language} {date or job_info['solution']}"
+            self.repair_summaries.append(format_repair_stats(repair_stats, name))
+        validation_report = None
+        if validate:
+            validation_report = self.validate_puzzle_clues(
+                results,
+                job_info,
+                prompts_by_word,
+                model=model,
+                thinking_budget=thinking_budget,
+                batch_function=batch_function,
+            )
+        results["solution"] = job_info["solution"]
 
         print(f"Writing to file {output_file}")
-        if output_file.name.endswith(".json.gz"):
-            with gzip.open(output_file, "wt") as f:
-                json.dump(results, f)
+        if shards:
+            name = output_file.name.removesuffix(".gz").removesuffix(".json")
+            write_sharded_puzzle(
+                results, output_file.with_name(name), shard_count=shards
+            )
+        elif zdict is not None:
+            write_compact_puzzle(
+                results,
+                output_file,
+                playable=self.word_index[job_info["word_size"]].playable,
+                zdict=zdict,
+            )
         else:
-            with open(output_file, "w") as f:
-                json.dump(results, f)
+            write_puzzle(results, output_file)
+        if validation_report is not None:
+            write_validation_report(validation_report, output_file)
+        if manifest is not None:
+            manifest.mark_collected(
+                language=self.language, date=date, solution=job_info["solution"]
+            )
         print(f"Done in {int(time.time() - start_time)} seconds")
+        return results
@@ -0,0 +1,34 @@
+# Accented letters of French words and their unaccented replacements, used
+# both to build the word lists and to read the words typed by players.
+ACCENT_REPLACEMENTS = {
+    "àâä": "a",
+    "éèêë": "e",
+    "îï": "i",
+    "ôö": "o",
+    "ûü": "u",
+    "ç": "c",
+    "œ": "oe",
+    "æ": "ae",
+}
+
+# Translation table for str.translate (and pandas' Series.str.translate),
+# covering lowercase and uppercase letters.
+ACCENT_TABLE = str.maketrans(
+    {
+        case(letter): case(replacement)
+        for letters, replacement in ACCENT_REPLACEMENTS.items()
+        for letter in letters
+        for case in (str.lower, str.upper)
+    }
+)
+
+
+def remove_accents(word: str) -> str:
+    """Replace all accented characters with their unaccented version."""
+    return word.translate(ACCENT_TABLE)
+
+
+def normalize_word(word: str) -> str:
+    """Return a word typed by a player as it appears in the word lists
+    (uppercase, without accents), e.g. "élève " -> "ELEVE"."""
+    return remove_accents(word.strip().upper())
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from file_utils import atomic_write_json
+
+AVOID_LISTS_DIR = Path(__file__).parent / ".cache" / "avoid_lists"
+
+
+def template_hash(text: str) -> str:
+    """Return a short hash of the text of a prompt template."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def avoid_key(word: str, model: str, template_hash: str) -> str:
+    """Return the key of an avoid list in its language file, e.g.
+    "APPLE/gemini-2.5-flash/3f2a9c0b1d4e"."""
+    return f"{word}/{model}/{template_hash}"
+
+
+class AvoidListStore:
+    """The "things to avoid" generated for the secret words, kept on disk.
+
+    An avoid list is stored under (language, word, model, template hash), so
+    a secret word gets the same list every time it is played or turned into a
+    puzzle, and a new list is generated only when the model or the prompt
+    template changes. There is one JSON file per language, loaded on first use.
+
+    Args:
+        directory: Directory of the <language>.json files
+    """
+
+    def __init__(self, directory: Path | str = AVOID_LISTS_DIR):
+        self.directory = Path(directory)
+        self._lists = {}
+        self._lock = threading.Lock()
+
+    def path(self, language: str) -> Path:
+        return self.directory / f"{language}.json"
+
+    def _load(self, language: str) -> dict:
+        if language not in self._lists:
+            path = self.path(language)
+            self._lists[language] = (
+                json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+            )
+        return self._lists[language]
+
+    def get(
+        self, language: str, word: str, model: str, template_hash: str
+    ) -> Optional[dict]:
+        """Return the stored avoid list of this word, or None."""
+        with self._lock:
+            return self._load(language).get(avoid_key(word, model, template_hash))
+
+    def missing(
+        self, language: str, words: Iterable[str], model: str, template_hash: str
+    ) -> list[str]:
+        """Return the words without a stored avoid list."""
+        with self._lock:
+            lists = self._load(language)
+            return [
+                word
+                for word in words
+                if avoid_key(word, model, template_hash) not in lists
+            ]
+
+    def set(
+        self,
+        language: str,
+        model: str,
+        template_hash: str,
+        things_to_avoid_by_word: dict[str, dict],
+    ):
+        """Store the {word: things_to_avoid} lists and save the language file."""
+        with self._lock:
+            lists = self._load(language)
+            for word, things_to_avoid in things_to_avoid_by_word.items():
+                lists[avoid_key(word, model, template_hash)] = things_to_avoid
+            self._save(language)
+
+    def _save(self, language: str):
+        atomic_write_json(
+            self.path(language),
+            self._lists[language],
+            indent=1,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
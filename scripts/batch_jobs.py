@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from file_utils import atomic_write_json
+
+DEFAULT_MANIFEST_FILE = Path(__file__).parent / ".cache" / "batch_jobs.json"
+
+
+def job_key(input_hash: str, language: str = None, date: str = None) -> str:
+    """Return the manifest key of a job, e.g. "en/2025-06-01/3f2a..."."""
+    return "/".join(part for part in (language, date, input_hash) if part)
+
+
+class JobManifest:
+    """A JSON file recording the batch jobs submitted to Vertex AI.
+
+    Each entry holds the job name, where its input and output live in GCS, its
+    last known state, and any information given at submission (language, date,
+    secret word...). A process that dies while a job runs can then attach to
+    the job on the next run instead of submitting (and paying for) a new one.
+
+    Args:
+        path: Path of the JSON file (created on the first write)
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_MANIFEST_FILE):
+        self.path = Path(path)
+        self.jobs = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the entry of this job key, or None."""
+        with self._lock:
+            entry = self.jobs.get(key)
+            return None if entry is None else dict(entry)
+
+    def find(self, **fields) -> list[dict]:
+        """Return the entries with these field values, most recent first."""
+        with self._lock:
+            entries = [
+                dict(entry)
+                for entry in self.jobs.values()
+                if all(entry.get(name) == value for name, value in fields.items())
+            ]
+        return sorted(entries, key=lambda entry: entry["updated_at"], reverse=True)
+
+    def record(self, key: str, **fields):
+        """Create or update the entry of this job key, and save the manifest."""
+        with self._lock:
+            entry = self.jobs.setdefault(key, {"key": key})
+            entry.update(fields, updated_at=time.time())
+            self._save()
+
+    def puzzles(self, **fields) -> list[dict]:
+        """Return the puzzles of the recorded jobs with these field values
+        (language, date...), most recent first.
+
+        A job holds the information of one puzzle, or a list of "puzzles" when
+        several puzzles are packed in the same job. The key of the job is
+        added to each puzzle. The puzzles of failed jobs are left out, so their
+        dates and solutions can be picked again.
+        """
+        puzzles = []
+        for entry in self.find():
+            if "failed_at" in entry:
+                continue
+            for puzzle in entry.get("puzzles", [entry]):
+                puzzle = {**puzzle, "key": entry["key"]}
+                if "solution" in puzzle and all(
+                    puzzle.get(name) == value for name, value in fields.items()
+                ):
+                    puzzles.append(puzzle)
+        return puzzles
+
+    def pending(self) -> list[dict]:
+        """Return the entries of the jobs neither collected nor failed yet."""
+        with self._lock:
+            entries = [
+                dict(entry)
+                for entry in self.jobs.values()
+                if "collected_at" not in entry and "failed_at" not in entry
+            ]
+        return sorted(entries, key=lambda entry: entry["updated_at"])
+
+    def mark_collected(self, **fields):
+        """Mark the jobs with these field values as collected."""
+        for entry in self.find(**fields):
+            self.record(entry["key"], collected_at=time.time())
+
+    def mark_failed(self, **fields):
+        """Mark the jobs with these field values as failed (e.g. cancelled or
+        expired), so they are neither collected nor resumed."""
+        for entry in self.find(**fields):
+            self.record(entry["key"], failed_at=time.time())
+
+    def remove(self, key: str):
+        """Forget a job (e.g. once its results are written)."""
+        with self._lock:
+            if self.jobs.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        atomic_write_json(self.path, self.jobs, indent=2)
@@ -0,0 +1,57 @@
+"""Accent removal over the whole Lexique383 lexicon: the former regex-based
+``replace_accents`` vs. the translation table of accents.py.
+
+python -m word_lists.fr_words  # Downloads word_lists/data/Lexique383.tsv
+python benchmarks/bench_accents.py
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import click
+import pandas
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from accents import ACCENT_REPLACEMENTS, ACCENT_TABLE, remove_accents  # noqa: E402
+
+LEXICON_PATH = Path(__file__).parent.parent / "word_lists" / "data" / "Lexique383.tsv"
+
+
+def regex_replace_accents(word):
+    """The former implementation (one re.sub per group of letters)."""
+    for letters, replacement in ACCENT_REPLACEMENTS.items():
+        word = re.sub(f"[{letters}]", replacement, word)
+    return word
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+@click.command()
+@click.option("--lexicon", default=str(LEXICON_PATH), type=click.Path(exists=True))
+def main(lexicon):
+    words = pandas.read_csv(
+        lexicon, sep="\t", usecols=["ortho"], dtype={"ortho": "string"}
+    ).ortho.dropna()
+    word_list = words.tolist()
+    print(f"{len(word_list)} words")
+
+    regex_result, regex_time = _timed(
+        lambda: [regex_replace_accents(word) for word in word_list]
+    )
+    loop_result, loop_time = _timed(lambda: [remove_accents(w) for w in word_list])
+    series_result, series_time = _timed(lambda: words.str.translate(ACCENT_TABLE))
+    assert regex_result == loop_result == series_result.tolist()
+    print(f"re.sub per word:          {regex_time:.3f}s")
+    print(f"str.translate per word:   {loop_time:.3f}s")
+    print(f"Series.str.translate:     {series_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
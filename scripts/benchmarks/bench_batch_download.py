@@ -0,0 +1,59 @@
+"""Download and parse the output shards of a batch job from a fake GCS.
+
+python benchmarks/bench_batch_download.py --shards 8 --results 2000
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_gcs import FakeStorageClient  # noqa: E402
+from gemini_batch import _list_gcs_blobs, download_batch_results  # noqa: E402
+
+
+def _result_line(prompt_id: str) -> str:
+    text = f"THE WORD is related to {prompt_id.lower()}, but not quite. " * 4
+    return json.dumps(
+        {
+            "custom_id": prompt_id,
+            "status": "",
+            "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]},
+        }
+    )
+
+
+@click.command()
+@click.option("--shards", default=8, help="Number of output shards")
+@click.option("--results", default=2000, help="Number of results per shard")
+@click.option("--latency", default=0.1, help="Fake GCS latency per request (s)")
+@click.option("--bandwidth", default=20e6, help="Fake GCS bandwidth (bytes/s)")
+@click.option("--workers", default="1,8", help="Worker counts to compare")
+def main(shards, results, latency, bandwidth, workers):
+    client = FakeStorageClient(latency=latency, bandwidth=bandwidth)
+    prompt_ids = set()
+    for shard in range(shards):
+        ids = [f"WORD{shard}_{i}" for i in range(results)]
+        prompt_ids.update(ids)
+        data = "\n".join(_result_line(prompt_id) for prompt_id in ids)
+        client.put("bucket", f"batch_output/predictions_{shard}.jsonl", data.encode())
+    size = sum(len(data) for data in client.blobs.values())
+    print(f"{shards} shards, {len(prompt_ids)} results, {size / 1e6:.1f} MB")
+
+    for max_workers in [int(w) for w in workers.split(",")]:
+        start = time.perf_counter()
+        blob_names = _list_gcs_blobs(client, "bucket", "batch_output")
+        parsed = download_batch_results(
+            client, "bucket", blob_names, prompt_ids, max_workers=max_workers
+        )
+        duration = time.perf_counter() - start
+        assert len(parsed) == len(prompt_ids)
+        print(f"==> {max_workers} workers: {duration:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare per-call latency with a new client per call vs. a pooled provider.
+
+Runs against a local fake of the Gemini and OpenAI APIs, so it measures the
+client construction and connection overhead only (no TLS, no real model).
+
+    python benchmarks/bench_client_pool.py --calls 200 --latency 0.005
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from VerbiageGame import (  # noqa: E402
+    GeminiProvider,
+    OpenAIProvider,
+    run_gemini,
+    run_openai,
+)
+from google import genai  # noqa: E402
+from openai import OpenAI  # noqa: E402
+
+
+def time_calls(function, calls):
+    """Return the latencies (in ms) of ``calls`` successive calls."""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        latencies.append(1000 * (time.perf_counter() - start))
+    return latencies
+
+
+def report(name, latencies, connections):
+    print(
+        f"{name:<24} median {statistics.median(latencies):7.2f} ms, "
+        f"mean {statistics.mean(latencies):7.2f} ms, "
+        f"{connections} TCP connections"
+    )
+
+
+@click.command()
+@click.option("--calls", default=100, help="Number of calls per configuration")
+@click.option("--latency", default=0.0, help="Fake server latency in seconds")
+def main(calls, latency):
+    prompt = "Give a clue."
+    with FakeLLMServer(latency=latency) as server:
+        gemini_options = {
+            "api_key": "fake",
+            "http_options": genai.types.HttpOptions(base_url=server.url),
+        }
+        openai_options = {"api_key": "fake", "base_url": f"{server.url}/v1"}
+        gemini_provider = GeminiProvider(**gemini_options)
+        openai_provider = OpenAIProvider(**openai_options)
+        configurations = {
+            "gemini, client per call": lambda: run_gemini(
+                prompt, client=genai.Client(**gemini_options)
+            ),
+            "gemini, pooled provider": lambda: gemini_provider(prompt),
+            "openai, client per call": lambda: run_openai(
+                prompt, client=OpenAI(**openai_options)
+            ),
+            "openai, pooled provider": lambda: openai_provider(prompt),
+        }
+        for name, function in configurations.items():
+            server.connections_count = 0
+            latencies = time_calls(function, calls)
+            report(name, latencies, server.connections_count)
+
+
+if __name__ == "__main__":
+    main()
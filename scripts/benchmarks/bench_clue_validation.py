@@ -0,0 +1,79 @@
+"""Clue validation over published puzzles: one precompiled pattern per puzzle
+vs. one search per avoid term and clue.
+
+The archive doesn't keep the avoid lists, so each puzzle gets 20 random
+drawable words as avoid terms.
+
+python benchmarks/bench_clue_validation.py --language fr --puzzles 20
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from accents import remove_accents  # noqa: E402
+from puzzles import PUZZLES_DIR, read_puzzle  # noqa: E402
+from validation import validate_clues  # noqa: E402
+from word_index import WordIndex  # noqa: E402
+
+PLACEHOLDERS = {"en": r"\bTHE WORD(?:S|s)?\b", "fr": r"\bMOT(?:S|s)?\b"}
+
+
+def naive_validation(results, secret_word, avoid, placeholder):
+    """Check every term with its own regular expression, clue by clue."""
+    flagged = {}
+    for guess, clue in results.items():
+        if guess == "solution":
+            continue
+        problems = []
+        if not re.search(placeholder, clue):
+            problems.append("placeholder")
+        text = remove_accents(clue.upper())
+        for term in [secret_word, *avoid]:
+            term = remove_accents(term.upper())
+            if term != guess and re.search(rf"\b{re.escape(term)}(S|ES|X)?\b", text):
+                problems.append(term)
+        if problems:
+            flagged[guess] = problems
+    return flagged
+
+
+@click.command()
+@click.option("--language", default="en", type=click.Choice(["en", "fr"]))
+@click.option("--puzzles", default=10, help="Number of recent puzzles to check")
+def main(language, puzzles):
+    paths = sorted((PUZZLES_DIR / language).glob(f"{language}_*.json.gz"))[-puzzles:]
+    loaded = [read_puzzle(path) for path in paths]
+    drawable = WordIndex(language)[5].drawable
+    rng = random.Random(0)
+    avoid_lists = [rng.sample(drawable, 20) for _ in loaded]
+    placeholder = PLACEHOLDERS[language]
+    clues = sum(len(puzzle) - 1 for puzzle in loaded)
+
+    start = time.perf_counter()
+    for puzzle, avoid in zip(loaded, avoid_lists):
+        naive_validation(puzzle, puzzle["solution"], avoid, placeholder)
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flagged = 0
+    for puzzle, avoid in zip(loaded, avoid_lists):
+        report = validate_clues(puzzle, puzzle["solution"], avoid, placeholder)
+        flagged += len(report["flagged"])
+    compiled_time = time.perf_counter() - start
+
+    print(f"{len(loaded)} puzzles, {clues} clues, {flagged} flagged")
+    print(f"One search per term: {1000 * naive_time / len(loaded):.1f} ms per puzzle")
+    print(
+        f"Precompiled pattern: {1000 * compiled_time / len(loaded):.1f} ms per puzzle"
+    )
+
+
+if __name__ == "__main__":
+    main()
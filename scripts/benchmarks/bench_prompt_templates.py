@@ -0,0 +1,60 @@
+"""Time the rendering of the clue prompts of a whole puzzle.
+
+Compares the former approach (read the template file, one ``str.replace`` per
+placeholder, then one more per guess) with ``PromptTemplate``.
+
+    python benchmarks/bench_prompt_templates.py --language fr --word-size 5
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from VerbiageGame import VerbiageGame  # noqa: E402
+from prompt_template import PromptTemplate  # noqa: E402
+
+
+def format_template(template_path: Path, **kwargs):
+    """The former formatting function, re-reading the file at each call."""
+    template = template_path.read_text()
+    for key, value in kwargs.items():
+        template = template.replace(f"{{{{{key}}}}}", value)
+    return template
+
+
+@click.command()
+@click.option("--language", default="en", type=click.Choice(["en", "fr"]))
+@click.option("--word-size", default=5)
+@click.option("--repeats", default=20, help="Number of puzzles rendered")
+def main(language, word_size, repeats):
+    game = VerbiageGame(language=language)
+    playable = game.word_index[word_size].playable
+    template_path = game.prompts_path / "word_response.md"
+    secret = {"secret_word": "SECRET", "avoid": ", ".join(["word"] * 20)}
+    secret["advice"] = "Don't be obvious."
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        prompt = format_template(template_path, **secret)
+        former = [prompt.replace("{{player_word}}", word) for word in playable]
+    former_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    parsed_template = PromptTemplate.from_file(template_path)  # once per game
+    for _ in range(repeats):
+        template = parsed_template.partial(**secret)
+        rendered = [template.render(player_word=word) for word in playable]
+    template_time = (time.perf_counter() - start) / repeats
+
+    assert rendered == former
+    print(f"{len(playable)} prompts per puzzle")
+    print(f"str.replace:    {1000 * former_time:7.2f} ms per puzzle")
+    print(f"PromptTemplate: {1000 * template_time:7.2f} ms per puzzle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the size and decoding time of the .json.gz and compact puzzle formats
+over the whole puzzle archive.
+
+python benchmarks/bench_puzzle_format.py --holdout 5
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from puzzles import (  # noqa: E402
+    PUZZLES_DIR,
+    decode_compact_puzzle,
+    encode_compact_puzzle,
+    read_puzzle,
+    train_clue_dictionary,
+)
+
+WORD_LISTS_DIR = Path(__file__).parent.parent / "word_lists"
+
+
+def _time_per_call(function, items, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items)
+
+
+@click.command()
+@click.option("--holdout", default=5, help="Most recent puzzles left out of training")
+@click.option("--dictionary-size", default=32 * 1024, help="Dictionary size (bytes)")
+def main(holdout, dictionary_size):
+    for language in ["en", "fr"]:
+        paths = sorted((PUZZLES_DIR / language).glob(f"{language}_*.json.gz"))
+        puzzles = [read_puzzle(path) for path in paths]
+        all_words = json.loads(
+            (WORD_LISTS_DIR / language / f"{language}_words.json").read_text()
+        )
+        playables = [all_words[str(len(p["solution"]))]["playable"] for p in puzzles]
+        zdict = train_clue_dictionary(puzzles[:-holdout], size=dictionary_size)
+
+        gz_data = [path.read_bytes() for path in paths]
+        compact_data = [
+            encode_compact_puzzle(puzzle, playable, zdict)
+            for puzzle, playable in zip(puzzles, playables)
+        ]
+        for puzzle, data, playable in zip(puzzles, compact_data, playables):
+            assert decode_compact_puzzle(data, playable, zdict) == puzzle
+
+        gz_time = _time_per_call(read_puzzle, paths)
+        compact_time = _time_per_call(
+            lambda i: decode_compact_puzzle(compact_data[i], playables[i], zdict),
+            range(len(paths)),
+        )
+        gz_sizes = [len(data) for data in gz_data]
+        compact_sizes = [len(data) for data in compact_data]
+        print(f"{language}: {len(paths)} puzzles, dictionary {len(zdict)} bytes")
+        for name, selection in [
+            ("archive", slice(None)),
+            (f"last {holdout} (unseen)", slice(-holdout, None)),
+        ]:
+            gz, compact = sum(gz_sizes[selection]), sum(compact_sizes[selection])
+            count = len(gz_sizes[selection])
+            print(
+                f"  {name}: json.gz {gz / count / 1000:.1f} KB/puzzle, compact "
+                f"{compact / count / 1000:.1f} KB/puzzle ({compact / gz:.0%})"
+            )
+        print(
+            f"  decoding: json.gz {1000 * gz_time:.2f} ms, "
+            f"compact {1000 * compact_time:.2f} ms per puzzle"
+        )
+
+
+if __name__ == "__main__":
+    main()
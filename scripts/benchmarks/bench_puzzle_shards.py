@@ -0,0 +1,58 @@
+"""Bytes fetched by a typical game from sharded puzzles vs. the whole file.
+
+python benchmarks/bench_puzzle_shards.py --guesses 8 --games 200
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from puzzles import (  # noqa: E402
+    PUZZLES_DIR,
+    ShardedPuzzle,
+    read_puzzle,
+    write_sharded_puzzle,
+)
+
+
+@click.command()
+@click.option("--guesses", default=8, help="Guesses in a typical game")
+@click.option("--games", default=200, help="Number of simulated games")
+@click.option("--shard-counts", default="4,8,16,32,64", help="Hash bucket counts")
+def main(guesses, games, shard_counts):
+    paths = sorted(PUZZLES_DIR.glob("*/*.json.gz"))
+    monolithic = sum(path.stat().st_size for path in paths) / len(paths)
+    print(f"{len(paths)} puzzles, whole file: {monolithic / 1000:.1f} KB")
+    rng = random.Random(0)
+    layouts = [("letter", 0)] + [("hash", int(n)) for n in shard_counts.split(",")]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for shard_by, shard_count in layouts:
+            fetched = []
+            for path in paths:
+                puzzle = read_puzzle(path)
+                directory = Path(tmp_dir) / f"{shard_by}_{shard_count}" / path.stem
+                write_sharded_puzzle(puzzle, directory, shard_by, shard_count)
+                guessable = [guess for guess in puzzle if guess != "solution"]
+                for _ in range(games // len(paths) + 1):
+                    reader = ShardedPuzzle(directory)
+                    for guess in rng.sample(guessable, guesses):
+                        reader.clue(guess)
+                    fetched.append(reader.bytes_fetched)
+            mean = sum(fetched) / len(fetched)
+            first = ShardedPuzzle(directory)
+            first.clue(guessable[0])
+            name = "first letter" if shard_by == "letter" else f"{shard_count} buckets"
+            print(
+                f"{name}: {mean / 1000:.1f} KB per game of {guesses} guesses "
+                f"({mean / monolithic:.0%}), {first.bytes_fetched / 1000:.1f} KB "
+                "before the first clue"
+            )
+
+
+if __name__ == "__main__":
+    main()
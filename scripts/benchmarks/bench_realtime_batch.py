@@ -0,0 +1,54 @@
+"""Run a puzzle-sized batch through ``realtime_batch`` against a fake endpoint.
+
+python benchmarks/bench_realtime_batch.py --prompts 1700 --latency 0.5
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from realtime_batch import realtime_batch  # noqa: E402
+from google import genai  # noqa: E402
+
+
+@click.command()
+@click.option("--prompts", default=1700, help="Number of prompts in the batch")
+@click.option("--latency", default=0.5, help="Fake server latency in seconds")
+@click.option("--error-rate", default=0.05, help="Fraction of 429 responses")
+@click.option("--max-concurrency", default=32, help="Requests in flight")
+@click.option("--requests-per-minute", default=None, type=float)
+def main(prompts, latency, error_rate, max_concurrency, requests_per_minute):
+    prompts_by_word = {f"WORD{i}": f"Give a clue for word {i}." for i in range(prompts)}
+    with FakeLLMServer(
+        latency=latency,
+        response_text=lambda prompt: f"THE WORD answers: {prompt}",
+        error_rate=error_rate,
+    ) as server:
+        client = genai.Client(
+            api_key="fake", http_options=genai.types.HttpOptions(base_url=server.url)
+        )
+        start = time.perf_counter()
+        results, stats = realtime_batch(
+            prompts_by_word,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=None,
+            backoff_base=0.1,
+            client=client,
+        )
+        duration = time.perf_counter() - start
+    wrong = [k for k, v in results.items() if not v.endswith(prompts_by_word[k])]
+    print(
+        f"{len(results)} results in {duration:.1f}s "
+        f"({server.requests_count} requests, {stats['retries']} retries, "
+        f"{stats['failures']} failures, {len(wrong)} mismatched results)"
+    )
+
+
+if __name__ == "__main__":
+    main()
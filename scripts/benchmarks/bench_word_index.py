@@ -0,0 +1,59 @@
+"""Startup time and membership tests: WordIndex vs. parsing the JSON word list.
+
+python benchmarks/bench_word_index.py --language fr --word-size 5
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from word_index import WordIndex, words_json_path  # noqa: E402
+
+
+def _best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option("--language", default="en", type=click.Choice(["en", "fr"]))
+@click.option("--word-size", default=5, help="Size of the words of the game")
+@click.option("--repeat", default=50, help="Repetitions (the best time is kept)")
+def main(language, word_size, repeat):
+    json_path = words_json_path(language)
+
+    def load_json():
+        words = json.loads(json_path.read_text())[str(word_size)]
+        return words["playable"]
+
+    def load_index():
+        return WordIndex(language)[word_size].playable_set
+
+    json_time = _best_time(load_json, repeat)
+    index_time = _best_time(load_index, repeat)
+    print(
+        f"Startup: JSON {1000 * json_time:.2f} ms, WordIndex {1000 * index_time:.2f} ms"
+    )
+
+    playable = load_json()
+    playable_set = load_index()
+    guesses = playable[::7] + ["ZZZZZ"] * 100
+    list_time = _best_time(lambda: [g in playable for g in guesses], repeat)
+    set_time = _best_time(lambda: [g in playable_set for g in guesses], repeat)
+    print(
+        f"{len(guesses)} membership tests: list {1e6 * list_time / len(guesses):.2f} "
+        f"µs, frozenset {1e6 * set_time / len(guesses):.3f} µs per guess"
+    )
+
+
+if __name__ == "__main__":
+    main()
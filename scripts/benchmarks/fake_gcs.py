@@ -0,0 +1,105 @@
+"""In-memory stand-in for the ``google.cloud.storage`` client.
+
+Supports the calls made by ``gemini_batch`` (``bucket``, ``blob``, ``open``,
+``list_blobs``) with a simulated per-request latency and download bandwidth,
+so batch downloads can be exercised without a GCP project:
+
+    client = FakeStorageClient(latency=0.1, bandwidth=20e6)
+    client.put("bucket", "batch_output/predictions.jsonl", b"...")
+"""
+
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+
+class _SlowReader(io.BytesIO):
+    """Bytes stream whose reads take the time of a download at the bandwidth"""
+
+    def __init__(self, data: bytes, bandwidth: float):
+        super().__init__(data)
+        self.bandwidth = bandwidth
+
+    def _wait(self, size: int):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self._wait(len(data))
+        return data
+
+    def read1(self, size=-1):
+        data = super().read1(size)
+        self._wait(len(data))
+        return data
+
+
+class _Writer(io.BytesIO):
+    def __init__(self, on_close):
+        super().__init__()
+        self._on_close = on_close
+
+    def close(self):
+        if not self.closed:
+            self._on_close(self.getvalue())
+        super().close()
+
+
+class FakeBlob:
+    def __init__(self, client: "FakeStorageClient", bucket_name: str, name: str):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.name = name
+        self.content_encoding = None
+
+    def open(self, mode: str = "r", encoding: str = None, **kwargs):
+        if "w" in mode:
+            writer = _Writer(
+                lambda data: self.client.put(self.bucket_name, self.name, data)
+            )
+            return writer if "b" in mode else io.TextIOWrapper(writer, encoding)
+        self.client.wait()
+        data = self.client.blobs[self.bucket_name, self.name]
+        reader = _SlowReader(data, self.client.bandwidth)
+        return reader if "b" in mode else io.TextIOWrapper(reader, encoding)
+
+
+class FakeStorageClient:
+    """Fake GCS client keeping the blobs in memory.
+
+    Args:
+        latency: Seconds before the first byte of each request
+        bandwidth: Download speed in bytes per second (None: instant)
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: float = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.blobs = {}  # (bucket, name) -> bytes
+        self.requests_count = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            self.requests_count += 1
+        time.sleep(self.latency)
+
+    def put(self, bucket_name: str, name: str, data: bytes):
+        self.blobs[bucket_name, name] = data
+
+    def bucket(self, bucket_name: str):
+        return SimpleNamespace(
+            name=bucket_name,
+            blob=lambda name: FakeBlob(self, bucket_name, name),
+            list_blobs=lambda prefix="": self.list_blobs(bucket_name, prefix),
+        )
+
+    def list_blobs(self, bucket_name: str, prefix: str = ""):
+        self.wait()
+        return [
+            SimpleNamespace(name=name)
+            for bucket, name in sorted(self.blobs)
+            if bucket == bucket_name and name.startswith(prefix)
+        ]
@@ -0,0 +1,175 @@
+"""A local HTTP stand-in for the Gemini and OpenAI APIs, used by the benchmarks.
+
+It answers every ``generateContent`` (Gemini) or ``chat/completions`` (OpenAI)
+request with a canned clue after an artificial latency (or, at a chosen rate,
+with a 429 error), and counts the requests and the TCP connections it receives.
+Streaming requests get the clue word by word as server-sent events.
+"""
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded fake LLM server, to be used as a context manager.
+
+    Args:
+        latency: Seconds to wait before answering each request
+        response_text: Text of every answer (a function of the prompt is accepted)
+        error_rate: Fraction of requests answered with a 429 "rate limited" error
+        port: Port to listen on (0 picks a free port)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, latency=0.0, response_text="THE WORD is a test.", error_rate=0.0, port=0
+    ):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.response_text = response_text
+        self.error_rate = error_rate
+        self.requests_count = 0
+        self.connections_count = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def get_text(self, prompt):
+        if callable(self.response_text):
+            return self.response_text(prompt)
+        return self.response_text
+
+    def count(self, attribute):
+        with self._counter_lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count("connections_count")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.server.count("requests_count")
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            self._send_json({"error": {"code": 429, "message": "Rate limited"}}, 429)
+            return
+        if self.path.endswith("/chat/completions"):
+            prompt = body["messages"][-1]["content"]
+            text = self.server.get_text(prompt)
+            if body.get("stream"):
+                chunks = [_openai_chunk(word, body["model"]) for word in _split(text)]
+                chunks.append(_openai_chunk(None, body["model"], usage=True))
+                self._send_events(chunks + ["[DONE]"])
+                return
+            payload = _openai_response(text, body["model"])
+        elif ":streamGenerateContent" in self.path:
+            prompt = body["contents"][-1]["parts"][0]["text"]
+            words = _split(self.server.get_text(prompt))
+            chunks = [_gemini_response(word) for word in words]
+            self._send_events(chunks)
+            return
+        elif ":generateContent" in self.path:
+            prompt = body["contents"][-1]["parts"][0]["text"]
+            payload = _gemini_response(self.server.get_text(prompt))
+        else:
+            self.send_error(404)
+            return
+        self._send_json(payload)
+
+    def _send_events(self, events):
+        """Send server-sent events, one word of the answer at a time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event in events:
+            data = event if isinstance(event, str) else json.dumps(event)
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.latency / 10)
+        self.close_connection = True
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _openai_response(text, model):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+    }
+
+
+def _split(text):
+    """Split a text in word-sized chunks (keeping the spaces)."""
+    words = text.split(" ")
+    return [word + " " for word in words[:-1]] + words[-1:]
+
+
+def _openai_chunk(text, model, usage=False):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": []
+        if usage
+        else [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}
+        if usage
+        else None,
+    }
+
+
+def _gemini_response(text):
+    return {
+        "candidates": [
+            {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        ],
+        "usageMetadata": {
+            "promptTokenCount": 100,
+            "candidatesTokenCount": 10,
+            "thoughtsTokenCount": 0,
+            "totalTokenCount": 110,
+        },
+    }
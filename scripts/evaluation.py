@@ -0,0 +1,242 @@
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product
+from pathlib import Path
+from typing import Callable, Optional
+
+from accents import normalize_word
+from metrics import TOKEN_KINDS, percentile
+
+
+def play_self_game(
+    game,
+    word: str,
+    model: str,
+    thinking_budget: Optional[int] = None,
+    puzzle: Optional[dict] = None,
+    clue_model: str = "gemini-2.5-flash",
+    max_guesses: int = 20,
+    max_invalid: int = 10,
+    get_clue: Optional[Callable] = None,
+) -> dict:
+    """Play one silent self-play game and return its record.
+
+    The clues are read from the ``puzzle`` if provided (only the guesser calls
+    the model), else generated by ``get_clue`` (as returned by
+    ``VerbiageGame.get_clue_function``, possibly shared by several games), or
+    with ``clue_model`` if it isn't provided. The game stops when the
+    word is found, after ``max_guesses`` valid guesses, or after
+    ``max_invalid`` guesses that are not in the word list.
+
+    Returns:
+        A dictionary with the settings of the game, whether the word was
+        solved, the number of guesses, the tokens used by the guesser and by
+        the clues, and the duration of the game
+    """
+    start_time = time.perf_counter()
+    guesser_calls, clue_calls = [], []
+    record = {
+        "word": word,
+        "model": model,
+        "thinking_budget": thinking_budget,
+        "clues": "puzzle" if puzzle is not None else clue_model,
+        "solved": False,
+        "guesses": 0,
+        "invalid_guesses": 0,
+        "error": None,
+    }
+    try:
+        if puzzle is not None:
+            clue_function = puzzle.__getitem__
+        else:
+            if get_clue is None:
+                get_clue = game.get_clue_function(word, clue_model, quiet=True)
+
+            def clue_function(guess):
+                return get_clue(guess, on_call=clue_calls.append)
+
+        playable = game.word_index[len(word)].playable_set
+        clues = []
+        rejected = []
+        while record["guesses"] < max_guesses:
+            guess = normalize_word(
+                game.ai_play(
+                    clues,
+                    model,
+                    len(word),
+                    thinking_budget,
+                    on_call=guesser_calls.append,
+                    rejected=rejected,
+                )
+            )
+            if guess not in playable or (puzzle is not None and guess not in puzzle):
+                record["invalid_guesses"] += 1
+                if record["invalid_guesses"] >= max_invalid:
+                    break
+                rejected.append(guess)
+                continue
+            rejected.clear()
+            record["guesses"] += 1
+            if guess == word:
+                record["solved"] = True
+                break
+            clues.append(clue_function(guess))
+    except Exception as error:
+        record["error"] = f"{type(error).__name__}: {error}"
+    for name, calls in [("guesser", guesser_calls), ("clues", clue_calls)]:
+        record[f"{name}_calls"] = len(calls)
+        for kind in TOKEN_KINDS:
+            record[f"{name}_{kind}_tokens"] = sum(c[f"{kind}_tokens"] for c in calls)
+    record["tokens"] = sum(
+        record[f"{name}_{kind}_tokens"]
+        for name in ("guesser", "clues")
+        for kind in TOKEN_KINDS
+    )
+    record["duration"] = time.perf_counter() - start_time
+    return record
+
+
+def run_evaluation(
+    game,
+    words: list[str],
+    models: list[str],
+    thinking_budgets: list[Optional[int]],
+    puzzles: Optional[dict[str, dict]] = None,
+    games_per_setting: int = 1,
+    max_workers: int = 32,
+    clue_model: str = "gemini-2.5-flash",
+    **game_options,
+) -> list[dict]:
+    """Play self-play games concurrently for all the words and settings.
+
+    The things to avoid of each word without puzzle are generated once, and
+    its clue function is shared by all the games of the word (their tokens
+    are not counted in the records).
+
+    Args:
+        game: The VerbiageGame of the language of the words
+        words: The secret words
+        models: The models playing the guesser
+        thinking_budgets: The thinking budgets of the guesser (None: default)
+        puzzles: The {word: puzzle} puzzles to read the clues from. The clues
+          of the other words are generated with ``clue_model``
+        games_per_setting: Games played per word, model and thinking budget
+        max_workers: Maximum number of games played at the same time
+        clue_model: The model generating the clues of the words without puzzle
+        **game_options: Other parameters of ``play_self_game`` (max_guesses,
+          max_invalid)
+
+    Returns:
+        The records of the games (see ``play_self_game``)
+    """
+    puzzles = puzzles or {}
+    settings = list(product(words, models, thinking_budgets, range(games_per_setting)))
+    print(f"Playing {len(settings)} games on {max_workers} workers")
+    records = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Submitted before the games waiting for them, so a game never blocks
+        # a worker on a clue function still queued (see ``run_tests``)
+        clue_functions = {
+            word: executor.submit(game.get_clue_function, word, clue_model, quiet=True)
+            for word in words
+            if word not in puzzles
+        }
+
+        def shared_clue_function(word):
+            if word not in clue_functions:
+                return None
+            # Resolved in the game, so that a failure is recorded as its error
+            return lambda guess, **kwargs: clue_functions[word].result()(
+                guess, **kwargs
+            )
+
+        futures = [
+            executor.submit(
+                play_self_game,
+                game,
+                word,
+                model,
+                thinking_budget,
+                puzzle=puzzles.get(word),
+                clue_model=clue_model,
+                get_clue=shared_clue_function(word),
+                **game_options,
+            )
+            for word, model, thinking_budget, _ in settings
+        ]
+        for future in as_completed(futures):
+            records.append(future.result())
+            if len(records) % 50 == 0:
+                print(f"{len(records)}/{len(settings)} games played")
+    return records
+
+
+def _distribution(values) -> dict:
+    """Summary statistics of a list of numbers."""
+    return {
+        "mean": sum(values) / len(values) if values else 0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "max": max(values, default=0),
+    }
+
+
+def summarize_evaluation(records: list[dict]) -> list[dict]:
+    """Return the statistics of the games, per model and thinking budget.
+
+    Each entry holds the number of games, solve rate, the histogram and
+    distribution of the guesses needed to solve, and the distributions of the
+    tokens and duration of the games.
+    """
+    groups = {}
+    for record in records:
+        key = (record["model"], record["thinking_budget"])
+        groups.setdefault(key, []).append(record)
+    summaries = []
+    for (model, thinking_budget), group in groups.items():
+        solved = [record for record in group if record["solved"]]
+        guesses = [record["guesses"] for record in solved]
+        summaries.append(
+            {
+                "model": model,
+                "thinking_budget": thinking_budget,
+                "games": len(group),
+                "errors": sum(record["error"] is not None for record in group),
+                "solve_rate": len(solved) / len(group),
+                "guesses_to_solve": _distribution(guesses),
+                "guesses_histogram": dict(sorted(Counter(guesses).items())),
+                "tokens_per_game": _distribution([r["tokens"] for r in group]),
+                "seconds_per_game": _distribution([r["duration"] for r in group]),
+            }
+        )
+    return summaries
+
+
+def format_evaluation(summaries: list[dict]) -> str:
+    """Return a short human-readable summary, one line per setting."""
+    lines = []
+    for summary in summaries:
+        guesses = summary["guesses_to_solve"]
+        lines.append(
+            f"{summary['model']} (thinking budget {summary['thinking_budget']}): "
+            f"{summary['games']} games, {100 * summary['solve_rate']:.0f}% solved "
+            f"in {guesses['mean']:.1f} guesses on average (p90 {guesses['p90']}), "
+            f"{summary['tokens_per_game']['mean']:.0f} tokens and "
+            f"{summary['seconds_per_game']['mean']:.1f}s per game"
+        )
+    return "\n".join(lines)
+
+
+def write_evaluation_report(
+    path: Path | str, records: list[dict], settings: dict, wall_time: float
+):
+    """Write the settings, per-setting statistics and game records as JSON."""
+    report = {
+        "settings": settings,
+        "wall_time": wall_time,
+        "summary": summarize_evaluation(records),
+        "games": sorted(records, key=lambda r: (r["model"], r["word"])),
+    }
+    Path(path).write_text(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,19 @@
+import json
+import os
+from pathlib import Path
+
+
+def atomic_write_json(path: Path | str, data, **dumps_kwargs):
+    """Write data as a JSON file, replacing the file only once fully written.
+
+    Args:
+        path: Path of the JSON file (its directory is created if needed)
+        data: The JSON-serializable data
+        **dumps_kwargs: Options of ``json.dumps`` (indent, sort_keys...)
+    """
+    # Write to a temporary file first so a crash never leaves a partial file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, **dumps_kwargs), encoding="utf-8")
+    os.replace(tmp_path, path)
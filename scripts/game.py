@@ -1,16 +1,65 @@
 import click
 from functools import wraps
 from dotenv import load_dotenv
-from VerbiageGame import VerbiageGame
-from gemini_batch import gemini_batch
+from VerbiageGame import BATCH_SETTINGS, VerbiageGame
+from gemini_batch import (
+    RESUBMIT_STATES,
+    collect_batch,
+    gemini_batch,
+    submit_batch,
+    vertex_clients,
+)
+from realtime_batch import realtime_batch
+from repair import format_repair_stats, repair_results
+from puzzles import (
+    PUZZLES_DIR,
+    SolutionIndex,
+    clue_dictionary_path,
+    pack_prompts,
+    puzzle_path,
+    read_puzzle,
+    resolve_puzzle_path,
+    train_clue_dictionary,
+    unpack_results,
+    write_puzzle,
+)
+from response_cache import ResponseCache
+from avoid_lists import AVOID_LISTS_DIR, AvoidListStore
+from batch_jobs import DEFAULT_MANIFEST_FILE, JobManifest
+from metrics import MetricsCollector
+from accents import normalize_word
+from validation import write_validation_report
+from evaluation import (
+    format_evaluation,
+    run_evaluation,
+    summarize_evaluation,
+    write_evaluation_report,
+)
 import json
-from datetime import datetime, timezone
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import gzip
 
 # Useful to attribute special keys to this project
 load_dotenv()
 
+DEFAULT_CACHE_FILE = Path(__file__).parent / ".cache" / "llm_responses.sqlite"
+CALENDAR_FILE = (
+    Path(__file__).parent.parent / "verbiage" / "src" / "lib" / "puzzleCalendars.json"
+)
+BATCH_FUNCTIONS = {"vertex": gemini_batch, "realtime": realtime_batch}
+
+
+def metrics_file_option(f):
+    """Option to write the events of the LLM calls of a command."""
+    return click.option(
+        "--metrics-file",
+        default=None,
+        help="Write one event per LLM call to this file (JSON lines, or the "
+        "Prometheus text format if the name ends with .prom)",
+    )(f)
+
 
 def common_options(f):
     """Common options shared across all commands."""
@@ -40,6 +89,27 @@ def common_options(f):
         default=5,
         help="Size of the words to play with (default: 5)",
     )
+    @metrics_file_option
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+def cache_options(f):
+    """Options for caching LLM responses on disk."""
+
+    @click.option(
+        "--cache",
+        is_flag=True,
+        help="Cache LLM responses on disk and reuse them for identical requests",
+    )
+    @click.option(
+        "--cache-file",
+        default=str(DEFAULT_CACHE_FILE),
+        help="Path to the response cache (default: .cache/llm_responses.sqlite)",
+    )
     @wraps(f)
     def wrapper(*args, **kwargs):
         return f(*args, **kwargs)
@@ -47,6 +117,152 @@ def common_options(f):
     return wrapper
 
 
+def batch_backend_option(f):
+    """Option to choose how batches of prompts are run."""
+    return click.option(
+        "--batch-backend",
+        default="vertex",
+        type=click.Choice(list(BATCH_FUNCTIONS)),
+        help="Vertex batch job (cheaper, slow) or concurrent realtime requests "
+        "(default: vertex)",
+    )(f)
+
+
+def puzzle_option(f):
+    """Option to play a pre-generated puzzle offline."""
+    return click.option(
+        "--puzzle",
+        default=None,
+        help="Date (YYYY-MM-DD) of a published puzzle, or path to a puzzle file, "
+        "to read the clues from instead of calling the model",
+    )(f)
+
+
+def load_puzzle(language, puzzle):
+    """Read the puzzle designated by the --puzzle option, if any."""
+    if puzzle is None:
+        return None
+    return read_puzzle(resolve_puzzle_path(language, puzzle))
+
+
+def stream_option(f):
+    """Option to print the clues as they are generated."""
+    return click.option(
+        "--stream",
+        is_flag=True,
+        help="Print the clues as they are generated instead of all at once",
+    )(f)
+
+
+def job_manifest_option(f):
+    """Option to choose the file recording the submitted batch jobs."""
+    return click.option(
+        "--job-manifest",
+        default=str(DEFAULT_MANIFEST_FILE),
+        help="File recording the submitted Vertex batch jobs, so that a rerun "
+        "resumes the job of the day (default: .cache/batch_jobs.json)",
+    )(f)
+
+
+def avoid_lists_option(f):
+    """Option to reuse the things to avoid of the secret words."""
+    return click.option(
+        "--avoid-lists",
+        default=None,
+        help="Directory of the stored things to avoid of the secret words "
+        "(e.g. .cache/avoid_lists): reuse them and store the new ones "
+        "(default: generate them every time, store nothing)",
+    )(f)
+
+
+def deadline_option(f):
+    """Option to stop waiting for batch jobs after some time."""
+    return click.option(
+        "--deadline",
+        default=None,
+        type=float,
+        help="Stop waiting for the batch job after this many minutes (the job "
+        "keeps running and a rerun resumes it)",
+    )(f)
+
+
+def today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def puzzle_id(puzzle):
+    """Return the ID of a puzzle of the job manifest, e.g. "en_2025-06-01"."""
+    return f"{puzzle['language']}_{puzzle['date']}"
+
+
+def publish_puzzle(language, date, solution, solution_index):
+    """Record a new puzzle in the calendar of the app and the solution index."""
+    add_to_calendar(language, date)
+    solution_index.add(language, date, solution)
+
+
+def add_to_calendar(language, date):
+    """Add the puzzle of this date to the calendar of the app (most recent first)."""
+    calendar_data = json.loads(CALENDAR_FILE.read_text())
+    dates = set(calendar_data[language]) | {date}
+    calendar_data[language] = sorted(dates, reverse=True)
+    CALENDAR_FILE.write_text(json.dumps(calendar_data, indent=2))
+
+
+def get_cache(cache, cache_file):
+    """Return the response cache if caching is enabled, else None."""
+    return ResponseCache(cache_file) if cache else None
+
+
+def create_game(language, debug, cache=False, cache_file=None, avoid_lists=None):
+    """Create the game of a command, recording the metrics of its LLM calls.
+
+    The things to avoid of the secret words are stored in the ``avoid_lists``
+    directory if provided. The connections of the game are closed when the
+    command exits."""
+    context = click.get_current_context()
+    game = VerbiageGame(
+        language=language,
+        debug=debug,
+        cache=get_cache(cache, cache_file),
+        metrics=MetricsCollector({"command": context.info_name, "language": language}),
+        avoid_lists=AvoidListStore(avoid_lists) if avoid_lists else None,
+    )
+    context.call_on_close(game.close)
+    return game
+
+
+def report_session(game, metrics_file=None):
+    """Print the cache and LLM usage summaries, and write the metrics file."""
+    report_sessions([game], metrics_file)
+
+
+def report_sessions(games, metrics_file=None, repair_summaries=()):
+    """Same as ``report_session`` for the games of the languages of a command,
+    with the metrics of all the games in the same file."""
+    for repair_summary in repair_summaries:
+        print(repair_summary)
+    for game in games:
+        if game.cache is not None:
+            print(game.cache.summary())
+        for repair_summary in game.repair_summaries:
+            print(repair_summary)
+        for validation_summary in game.validation_summaries:
+            print(validation_summary)
+    if len(games) == 1:
+        metrics = games[0].metrics
+    else:
+        command = click.get_current_context().info_name
+        metrics = MetricsCollector({"command": command})
+        for game in games:
+            metrics.merge(game.metrics)
+    if any(game.debug for game in games) or metrics_file is not None:
+        print(metrics.summary())
+    if metrics_file is not None:
+        metrics.write(metrics_file)
+        print(f"Metrics written to {metrics_file}")
+
+
 @click.group()
 def main():
     """Play the word guessing game in English or French.
@@ -56,103 +272,464 @@ def main():
         python game.py test --language fr --word POPE
         python game.py daily-puzzle --word-size 5
         python game.py batch --language en --word-size 5 --output-file batch_en_5.json
+        python game.py submit --language en --language fr --date 2025-06-01
+        python game.py collect
     """
     pass
 
 
 @main.command()
 @common_options
-def play(language, word, model, debug, word_size, thinking_budget):
+@cache_options
+@avoid_lists_option
+@puzzle_option
+@stream_option
+@click.option(
+    "--prefetch",
+    default=0,
+    help="Number of clues to generate in the background for likely guesses "
+    "while you type (default: 0, no prefetching)",
+)
+def play(
+    language,
+    word,
+    model,
+    debug,
+    word_size,
+    thinking_budget,
+    metrics_file,
+    cache,
+    cache_file,
+    avoid_lists,
+    puzzle,
+    stream,
+    prefetch,
+):
     """Play the word guessing game."""
     # Create game instance for the specified language
 
     if word is not None:
         word_size = len(word)
 
-    game = VerbiageGame(language=language, debug=debug)
+    game = create_game(language, debug, cache, cache_file, avoid_lists)
     game.play(
         word_size=word_size,
         word=word,
         model=model,
         thinking_budget=thinking_budget,
+        prefetch_budget=prefetch,
+        puzzle=load_puzzle(language, puzzle),
+        stream=stream,
     )
+    report_session(game, metrics_file)
 
 
 @main.command()
 @common_options
-def self_play(language, word, model, debug, word_size, thinking_budget):
+@cache_options
+@avoid_lists_option
+@puzzle_option
+@stream_option
+def self_play(
+    language,
+    word,
+    model,
+    debug,
+    word_size,
+    thinking_budget,
+    metrics_file,
+    cache,
+    cache_file,
+    avoid_lists,
+    puzzle,
+    stream,
+):
     """Play the word guessing game."""
     # Create game instance for the specified language
 
     if word is not None:
         word_size = len(word)
 
-    game = VerbiageGame(language=language, debug=debug)
+    game = create_game(language, debug, cache, cache_file, avoid_lists)
     game.play(
         word_size=word_size,
         word=word,
         model=model,
         thinking_budget=thinking_budget,
         self_play=True,
+        puzzle=load_puzzle(language, puzzle),
+        stream=stream,
     )
+    report_session(game, metrics_file)
 
 
 @main.command()
 @common_options
-def test(language, word, model, debug, thinking_budget, word_size):
+@cache_options
+@avoid_lists_option
+@click.option(
+    "--workers",
+    default=8,
+    help="Number of LLM calls to run concurrently (default: 8)",
+)
+def test(
+    language,
+    word,
+    model,
+    debug,
+    thinking_budget,
+    word_size,
+    metrics_file,
+    cache,
+    cache_file,
+    avoid_lists,
+    workers,
+):
     """Run tests on a series of words."""
     # Create game instance for the specified language
-    game = VerbiageGame(language=language, debug=debug)
+    game = create_game(language, debug, cache, cache_file, avoid_lists)
 
-    game.run_tests(model=model, word=word, thinking_budget=thinking_budget)
+    game.run_tests(
+        model=model, word=word, thinking_budget=thinking_budget, max_workers=workers
+    )
+    report_session(game, metrics_file)
 
 
 @main.command()
 @common_options
-def daily(language, word, model, debug, word_size, thinking_budget):
+@batch_backend_option
+@job_manifest_option
+@deadline_option
+@avoid_lists_option
+def daily(
+    language,
+    word,
+    model,
+    debug,
+    word_size,
+    thinking_budget,
+    metrics_file,
+    batch_backend,
+    job_manifest,
+    deadline,
+    avoid_lists,
+):
     """Automatically generate a daily word."""
     # Create game instance for the specified language
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    app_dir = Path(__file__).parent.parent / "verbiage"
-    puzzles_dir = app_dir / "public" / "puzzles"
-    output_file = puzzles_dir / language / f"{language}_{today}.json.gz"
-    game = VerbiageGame(language=language, debug=debug)
+    date = today()
+    output_file = puzzle_path(language, date)
+    game = create_game(language, debug, avoid_lists=avoid_lists)
+    solution_index = SolutionIndex()
 
     if word is not None:
         word_size = len(word)
 
-    words_to_exclude = []
-    for gz_file in puzzles_dir.glob(f"{language}*.json.gz"):
-        with gzip.open(gz_file, "rt") as f:
-            words_to_exclude.extend(json.load(f)["solution"])
-
-    game.generate_batch(
+    puzzle = game.generate_batch(
         word_size=word_size,
         model=model,
         word=word,
         output_file=output_file,
         thinking_budget=thinking_budget,
-        batch_function=gemini_batch,
-        words_to_exclude=words_to_exclude,
+        batch_function=BATCH_FUNCTIONS[batch_backend],
+        words_to_exclude=solution_index.solutions(language),
+        date=date,
+        manifest=JobManifest(job_manifest) if batch_backend == "vertex" else None,
+        deadline=None if deadline is None else 60 * deadline,
     )
-    # Update puzzleCalendar.json
-    calendar_file = app_dir / "src" / "lib" / "puzzleCalendars.json"
-    calendar_data = json.loads(calendar_file.read_text())
-    calendar_data[language] = [today] + calendar_data[language]
-    calendar_file.write_text(json.dumps(calendar_data, indent=2))
+    # Update puzzleCalendar.json and the solution index
+    publish_puzzle(language, date, puzzle["solution"], solution_index)
+    report_session(game, metrics_file)
+
+
+@main.command()
+@click.option(
+    "--language",
+    "languages",
+    multiple=True,
+    default=["en", "fr"],
+    type=click.Choice(["en", "fr"]),
+    help="Language of the puzzles, can be repeated (default: en and fr)",
+)
+@click.option(
+    "--date",
+    "dates",
+    multiple=True,
+    help="Date (YYYY-MM-DD) of a puzzle, can be repeated (default: today)",
+)
+@click.option(
+    "--days",
+    default=0,
+    help="Also make the puzzles of this many consecutive days from today",
+)
+@click.option(
+    "--pack",
+    is_flag=True,
+    help="Put all the puzzles in a single batch job instead of one job each",
+)
+@click.option(
+    "--word-size",
+    default=5,
+    help="Size of the words to play with (default: 5)",
+)
+@click.option(
+    "--model",
+    default="gemini-2.5-flash",
+    help="AI model to use (default: gemini-2.5-flash)",
+)
+@click.option(
+    "--thinking-budget",
+    default=None,
+    help="Budget for thinking in tokens (default: None)",
+)
+@click.option("--debug", is_flag=True, help="Show the secret words")
+@job_manifest_option
+@avoid_lists_option
+@metrics_file_option
+def submit(
+    languages,
+    dates,
+    days,
+    pack,
+    word_size,
+    model,
+    thinking_budget,
+    debug,
+    job_manifest,
+    avoid_lists,
+    metrics_file,
+):
+    """Submit the batch jobs of puzzles and return without waiting for them.
+
+    The jobs are recorded in the job manifest, run `collect` to write the
+    puzzles when they are done. With --pack, all the puzzles are generated by
+    a single job (e.g. a month of puzzles for one job round-trip).
+    """
+    manifest = JobManifest(job_manifest)
+    client, storage_client = vertex_clients(
+        BATCH_SETTINGS["project_id"], BATCH_SETTINGS["location"]
+    )
+    start_date = datetime.now(timezone.utc)
+    dates = list(dates) + [
+        (start_date + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days)
+    ]
+    batch_options = {
+        "model": model,
+        "temperature": BATCH_SETTINGS["temperature"],
+        "gcs_bucket": BATCH_SETTINGS["gcs_bucket"],
+        "thinking_budget": thinking_budget,
+        "manifest": manifest,
+    }
+    packed_prompts = {}
+    packed_puzzles = []
+    solution_index = SolutionIndex()
+    games = []
+    for language in languages:
+        game = create_game(language, debug, avoid_lists=avoid_lists)
+        games.append(game)
+        words_to_exclude = solution_index.solutions(language)
+        words_to_exclude.update(
+            puzzle["solution"] for puzzle in manifest.puzzles(language=language)
+        )
+        for date in dict.fromkeys(dates or [today()]):
+            prompts_by_word, job_info = game.prepare_batch(
+                word_size=word_size,
+                model=model,
+                words_to_exclude=words_to_exclude,
+                date=date,
+                manifest=manifest,
+            )
+            game.debug_print(
+                f"Secret word of {language} {date}: {job_info['solution']}"
+            )
+            words_to_exclude.add(job_info["solution"])
+            if pack:
+                packed_prompts[puzzle_id(job_info)] = prompts_by_word
+                packed_puzzles.append(job_info)
+            else:
+                submit_batch(
+                    client,
+                    storage_client,
+                    prompts_by_word,
+                    job_info=job_info,
+                    **batch_options,
+                )
+
+    if pack:
+        print(f"Packing {len(packed_puzzles)} puzzles in one batch job")
+        submit_batch(
+            client,
+            storage_client,
+            pack_prompts(packed_prompts),
+            job_info={"puzzles": packed_puzzles},
+            **batch_options,
+        )
+    report_sessions(games, metrics_file)
+
+
+@main.command()
+@click.option(
+    "--language",
+    "languages",
+    multiple=True,
+    type=click.Choice(["en", "fr"]),
+    help="Only collect the puzzles of this language, can be repeated",
+)
+@job_manifest_option
+@deadline_option
+@metrics_file_option
+@click.option("--debug", is_flag=True, help="Show the LLM usage summary")
+def collect(languages, job_manifest, deadline, metrics_file, debug):
+    """Wait for the submitted batch jobs and write their puzzles.
+
+    All the jobs are waited for concurrently, and each puzzle file and
+    calendar entry is written as soon as its job is done.
+    """
+    manifest = JobManifest(job_manifest)
+    entries = [
+        entry
+        for entry in manifest.pending()
+        if any(
+            not languages or puzzle["language"] in languages
+            for puzzle in manifest.puzzles(key=entry["key"])
+        )
+    ]
+    if not entries:
+        print("No batch jobs to collect")
+        return
+    client, storage_client = vertex_clients(
+        BATCH_SETTINGS["project_id"], BATCH_SETTINGS["location"]
+    )
+    games = {
+        language: create_game(language, debug)
+        for language in {
+            puzzle["language"]
+            for entry in entries
+            for puzzle in manifest.puzzles(key=entry["key"])
+        }
+    }
+    repair_summaries = []
+    solution_index = SolutionIndex()
+
+    def collect_puzzles(entry):
+        """Return the [(puzzle, results)] of the puzzles of a job."""
+        packed = "puzzles" in entry
+        puzzles = manifest.puzzles(key=entry["key"])
+        prompts_by_puzzle = {
+            puzzle_id(puzzle): games[puzzle["language"]].puzzle_prompts(puzzle)
+            for puzzle in puzzles
+        }
+        prompts = (
+            pack_prompts(prompts_by_puzzle)
+            if packed
+            else prompts_by_puzzle[puzzle_id(puzzles[0])]
+        )
+        results, _job = collect_batch(
+            client,
+            storage_client,
+            entry,
+            prompts,
+            key=entry["key"],
+            manifest=manifest,
+            poll_deadline=None if deadline is None else 60 * deadline,
+        )
+        repair_stats = repair_results(
+            results,
+            prompts,
+            model=entry["model"],
+            thinking_budget=entry.get("thinking_budget"),
+            **BATCH_SETTINGS,
+        )
+        repair_summaries.append(format_repair_stats(repair_stats, entry["job_name"]))
+        if packed:
+            results_by_puzzle = unpack_results(results)
+        else:
+            results_by_puzzle = {puzzle_id(puzzles[0]): results}
+        collected = []
+        for puzzle in puzzles:
+            puzzle_results = results_by_puzzle[puzzle_id(puzzle)]
+            validation_report = games[puzzle["language"]].validate_puzzle_clues(
+                puzzle_results,
+                puzzle,
+                prompts_by_puzzle[puzzle_id(puzzle)],
+                model=entry["model"],
+                thinking_budget=entry.get("thinking_budget"),
+            )
+            collected.append((puzzle, puzzle_results, validation_report))
+        return collected
+
+    print(f"Waiting for {len(entries)} batch jobs")
+    failures = 0
+    with ThreadPoolExecutor(max_workers=len(entries)) as executor:
+        futures = {executor.submit(collect_puzzles, entry): entry for entry in entries}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                collected = future.result()
+            except Exception as error:
+                print(f"Could not collect the job {entry['job_name']}: {error}")
+                failures += 1
+                state = (manifest.get(entry["key"]) or {}).get("state")
+                if state in RESUBMIT_STATES:
+                    # Not waited for again: submit its dates again if needed
+                    manifest.mark_failed(key=entry["key"])
+                continue
+            for puzzle, results, validation_report in collected:
+                results["solution"] = puzzle["solution"]
+                output_file = puzzle_path(puzzle["language"], puzzle["date"])
+                write_puzzle(results, output_file)
+                write_validation_report(validation_report, output_file)
+                publish_puzzle(
+                    puzzle["language"],
+                    puzzle["date"],
+                    puzzle["solution"],
+                    solution_index,
+                )
+                print(f"Puzzle {puzzle_id(puzzle)} written to {output_file}")
+            manifest.mark_collected(key=entry["key"])
+    report_sessions(list(games.values()), metrics_file, repair_summaries)
+    if failures:
+        raise click.ClickException(f"{failures} batch jobs could not be collected")
 
 
 @main.command()
 @common_options
+@batch_backend_option
 @click.option(
     "--output-file",
     default=None,
     help="Path to the output file for batch generation",
 )
-def batch(language, word, model, output_file, word_size, thinking_budget, debug):
+@click.option(
+    "--shards",
+    default=None,
+    type=int,
+    help="Write the puzzle as this many shards and a header, in a directory "
+    "named after the output file",
+)
+@avoid_lists_option
+def batch(
+    language,
+    word,
+    model,
+    output_file,
+    word_size,
+    thinking_budget,
+    debug,
+    metrics_file,
+    batch_backend,
+    shards,
+    avoid_lists,
+):
     """Run all the playable words through the model."""
+    is_compact = output_file is not None and output_file.endswith(".vbp")
+    if is_compact and not shards and not clue_dictionary_path(language).exists():
+        raise click.UsageError(
+            f"No clue dictionary at {clue_dictionary_path(language)} to write a "
+            f"compact puzzle, train it with `python game.py train-dictionary "
+            f"--language {language}`"
+        )
     # Create game instance for the specified language
-    game = VerbiageGame(language=language, debug=debug)
+    game = create_game(language, debug, avoid_lists=avoid_lists)
 
     if word is not None:
         word_size = len(word)
@@ -166,8 +743,224 @@ def batch(language, word, model, output_file, word_size, thinking_budget, debug)
         word=word,
         output_file=output_file,
         thinking_budget=thinking_budget,
-        batch_function=gemini_batch,
+        batch_function=BATCH_FUNCTIONS[batch_backend],
+        shards=shards,
     )
+    report_session(game, metrics_file)
+
+
+@main.command()
+@click.option(
+    "--language",
+    default="en",
+    type=click.Choice(["en", "fr"]),
+    help="Language of the words (default: en)",
+)
+@click.option(
+    "--word-size",
+    "word_sizes",
+    multiple=True,
+    type=int,
+    help="Size of the drawable words, can be repeated (default: all sizes)",
+)
+@click.option(
+    "--model",
+    default="gemini-2.5-flash",
+    help="AI model to use (default: gemini-2.5-flash)",
+)
+@click.option("--debug", is_flag=True, help="Show the unparsable responses")
+@batch_backend_option
+@job_manifest_option
+@deadline_option
+@click.option(
+    "--avoid-lists",
+    default=str(AVOID_LISTS_DIR),
+    help="Directory of the stored things to avoid (default: .cache/avoid_lists)",
+)
+def pregenerate_avoid_lists(
+    language,
+    word_sizes,
+    model,
+    debug,
+    batch_backend,
+    job_manifest,
+    deadline,
+    avoid_lists,
+):
+    """Generate the things to avoid of all the drawable words in one batch.
+
+    The lists are added to the avoid list store (<avoid-lists>/<language>.json),
+    where the games and puzzle generation find them instead of calling the
+    model when a secret word is picked (with the same --avoid-lists). Words
+    with a stored list are skipped.
+    """
+    game = create_game(language, debug, avoid_lists=avoid_lists)
+    job_options = {}
+    if batch_backend == "vertex":
+        job_options = {
+            "manifest": JobManifest(job_manifest),
+            "job_info": {"language": language, "kind": "avoid_lists"},
+            "poll_deadline": None if deadline is None else 60 * deadline,
+        }
+    stats = game.pregenerate_things_to_avoid(
+        word_sizes=word_sizes,
+        model=model,
+        batch_function=BATCH_FUNCTIONS[batch_backend],
+        **job_options,
+    )
+    if batch_backend == "vertex":
+        job_options["manifest"].mark_collected(language=language, kind="avoid_lists")
+    print(f"{stats['generated']} avoid lists generated, {stats['failed']} failed")
+    if stats["failed"]:
+        print("Rerun the command to retry the failed words")
+    report_session(game)
+
+
+@main.command()
+@click.option(
+    "--language",
+    default="en",
+    type=click.Choice(["en", "fr"]),
+    help="Language of the games (default: en)",
+)
+@click.option(
+    "--puzzle",
+    "puzzles",
+    multiple=True,
+    help="Date (YYYY-MM-DD) or path of a puzzle to play, can be repeated",
+)
+@click.option("--last", default=0, help="Also play the N most recent published puzzles")
+@click.option(
+    "--word",
+    "words",
+    multiple=True,
+    help="Secret word to play, can be repeated. The clues are read from its "
+    "puzzle if it was published, else generated",
+)
+@click.option(
+    "--model",
+    "models",
+    multiple=True,
+    default=["gemini-2.5-flash"],
+    help="Model of the guesser, can be repeated (default: gemini-2.5-flash)",
+)
+@click.option(
+    "--thinking-budget",
+    "thinking_budgets",
+    multiple=True,
+    type=int,
+    help="Thinking budget of the guesser, can be repeated (default: the "
+    "model's default)",
+)
+@click.option(
+    "--clue-model",
+    default="gemini-2.5-flash",
+    help="Model generating the clues of the words without a puzzle",
+)
+@click.option("--games", default=1, help="Games per word and setting (default: 1)")
+@click.option("--max-guesses", default=20, help="Guesses before giving up")
+@click.option("--workers", default=32, help="Games played at the same time")
+@click.option(
+    "--report",
+    default="self_play_report.json",
+    help="Path of the JSON report (default: self_play_report.json)",
+)
+@click.option("--debug", is_flag=True, help="Show the LLM calls")
+@avoid_lists_option
+def evaluate(
+    language,
+    puzzles,
+    last,
+    words,
+    models,
+    thinking_budgets,
+    clue_model,
+    games,
+    max_guesses,
+    workers,
+    report,
+    debug,
+    avoid_lists,
+):
+    """Measure the difficulty of puzzles with many concurrent self-play games.
+
+    Writes the distributions of the guesses needed to solve, the tokens and
+    the duration of the games, per model and thinking budget, to a JSON report.
+    """
+    words = [normalize_word(word) for word in words]
+    solutions_by_date = SolutionIndex().index.get(language, {})
+    dates = sorted(solutions_by_date, reverse=True)[:last]
+    puzzles_by_word = {}
+    for date_or_path in [*dates, *puzzles]:
+        puzzle = read_puzzle(resolve_puzzle_path(language, date_or_path))
+        puzzles_by_word[puzzle["solution"]] = puzzle
+    for word in words:
+        word_dates = [date for date, w in solutions_by_date.items() if w == word]
+        if word_dates and word not in puzzles_by_word:
+            puzzles_by_word[word] = read_puzzle(puzzle_path(language, max(word_dates)))
+    secret_words = list(dict.fromkeys([*puzzles_by_word, *words]))
+    if not secret_words:
+        raise click.UsageError("Give puzzles (--puzzle, --last) or words (--word)")
+
+    game = create_game(language, debug, avoid_lists=avoid_lists)
+    start_time = time.perf_counter()
+    records = run_evaluation(
+        game,
+        secret_words,
+        models,
+        thinking_budgets or [None],
+        puzzles=puzzles_by_word,
+        games_per_setting=games,
+        max_workers=workers,
+        clue_model=clue_model,
+        max_guesses=max_guesses,
+    )
+    wall_time = time.perf_counter() - start_time
+    settings = {
+        "language": language,
+        "words": secret_words,
+        "puzzle_words": sorted(puzzles_by_word),
+        "models": list(models),
+        "thinking_budgets": list(thinking_budgets) or [None],
+        "clue_model": clue_model,
+        "games_per_setting": games,
+        "max_guesses": max_guesses,
+    }
+    write_evaluation_report(report, records, settings, wall_time)
+    print(format_evaluation(summarize_evaluation(records)))
+    print(f"{len(records)} games in {wall_time:.1f}s, report written to {report}")
+    report_session(game)
+
+
+@main.command()
+def rebuild_index():
+    """Rebuild the index of the past solutions from the puzzle archive."""
+    solution_index = SolutionIndex()
+    solution_index.rebuild()
+    for language, solutions in sorted(solution_index.index.items()):
+        print(f"{language}: {len(solutions)} puzzles")
+
+
+@main.command()
+@click.option(
+    "--language",
+    default="en",
+    type=click.Choice(["en", "fr"]),
+    help="Language of the puzzles (default: en)",
+)
+@click.option(
+    "--size",
+    default=32 * 1024,
+    help="Size of the dictionary in bytes (default: 32768, the zlib maximum)",
+)
+def train_dictionary(language, size):
+    """Train the dictionary of the compact puzzle files (.vbp) on the archive."""
+    paths = sorted((PUZZLES_DIR / language).glob(f"{language}_*.json.gz"))
+    zdict = train_clue_dictionary([read_puzzle(path) for path in paths], size=size)
+    output_file = clue_dictionary_path(language)
+    output_file.write_bytes(zdict)
+    print(f"Dictionary of {len(zdict)} bytes trained on {len(paths)} puzzles")
+    print(f"Written to {output_file}")
 
 
 if __name__ == "__main__":
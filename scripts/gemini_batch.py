@@ -1,13 +1,32 @@
+import gzip
+import hashlib
 import time
+import uuid
 import json
-import tempfile
 import os
 import warnings
-from pathlib import Path
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Container, Dict, Iterable, Iterator, Mapping, Optional
 from google import genai
 from google.genai.types import CreateBatchJobConfig, JobState, HttpOptions
 from google.cloud import storage
+from batch_jobs import JobManifest, job_key
+
+COMPLETED_STATES = {
+    JobState.JOB_STATE_SUCCEEDED,
+    JobState.JOB_STATE_FAILED,
+    JobState.JOB_STATE_CANCELLED,
+    JobState.JOB_STATE_PAUSED,
+    JobState.JOB_STATE_EXPIRED,
+}
+# Jobs in these states are submitted again rather than resumed (a paused job
+# never completes by itself)
+RESUBMIT_STATES = {
+    JobState.JOB_STATE_FAILED.value,
+    JobState.JOB_STATE_CANCELLED.value,
+    JobState.JOB_STATE_PAUSED.value,
+    JobState.JOB_STATE_EXPIRED.value,
+}
 
 
 def _create_batch_request(
@@ -53,7 +72,7 @@ def _parse_result_line(line: str) -> tuple[str | None, str]:
 
         # Extract the response text from the result
         response_text = ""
-        if "error" in result["status"].lower():
+        if "error" in str(result.get("status", "")).lower():
             warnings.warn(f"Error in result: {result}")
         if "response" in result:
             candidates = result["response"].get("candidates", [])
@@ -68,52 +87,60 @@ def _parse_result_line(line: str) -> tuple[str | None, str]:
         return None, ""
 
 
-def _upload_to_gcs(
-    local_file_path: str,
+def _iter_batch_requests(
+    prompts: Mapping[str, str], temperature: float, thinking_budget: int = None
+) -> Iterator[str]:
+    """Yield the JSONL lines of the batch input, one request at a time (the
+    prompts can be rendered as they are read, see ``puzzles.LazyPrompts``)"""
+    for prompt_id, prompt_text in prompts.items():
+        yield (
+            _create_batch_request(prompt_id, prompt_text, temperature, thinking_budget)
+            + "\n"
+        )
+
+
+def _upload_lines_to_gcs(
+    storage_client: storage.Client,
+    lines: Iterable[str],
     bucket_name: str,
-    blob_name: Optional[str] = None,
-    project_id: Optional[str] = None,
+    blob_name: str,
+    compress: bool = False,
 ) -> str:
-    """Upload a file to Google Cloud Storage
+    """Stream lines of text to a blob in Google Cloud Storage
+
+    The lines are written to the upload stream as they are produced, so the
+    whole file is never held in memory.
 
     Args:
-        local_file_path: Path to the local file to upload
+        storage_client: GCS client
+        lines: Lines of text (with their line breaks) to write
         bucket_name: Name of the GCS bucket
-        blob_name: Name for the blob in GCS. If None, uses the filename
-        project_id: GCP project ID. If None, uses default from environment
+        blob_name: Name for the blob in GCS
+        compress: Whether to gzip the stream. The blob is then stored with a
+          gzip content-encoding, which GCS decompresses for readers.
 
     Returns:
         GCS URI of the uploaded file (gs://bucket/blob)
     """
-    if blob_name is None:
-        blob_name = Path(local_file_path).name
-
-    # Initialize the GCS client
-    if project_id:
-        client = storage.Client(project=project_id)
-    else:
-        client = storage.Client()
-
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-
-    # Upload the file
-    blob.upload_from_filename(local_file_path)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    if compress:
+        blob.content_encoding = "gzip"
+    with blob.open("wb", ignore_flush=True, content_type="application/jsonl") as f:
+        stream = gzip.GzipFile(fileobj=f, mode="wb") if compress else f
+        for line in lines:
+            stream.write(line.encode("utf-8"))
+        if compress:
+            stream.close()
 
     return f"gs://{bucket_name}/{blob_name}"
 
 
-def _download_from_gcs(
-    gcs_uri: str,
-    local_file_path: str,
-    project_id: Optional[str] = None,
-) -> None:
-    """Download a file from Google Cloud Storage
+def _iter_gcs_lines(storage_client: storage.Client, gcs_uri: str) -> Iterator[str]:
+    """Yield the lines of a file in Google Cloud Storage as they are downloaded
 
     Args:
-        gcs_uri: GCS URI of the file to download (gs://bucket/blob)
-        local_file_path: Local path where to save the downloaded file
-        project_id: GCP project ID. If None, uses default from environment
+        storage_client: GCS client
+        gcs_uri: GCS URI of the file to read (gs://bucket/blob)
     """
     # Parse the GCS URI
     if not gcs_uri.startswith("gs://"):
@@ -125,180 +152,420 @@ def _download_from_gcs(
 
     bucket_name, blob_name = uri_parts
 
-    # Initialize the GCS client
-    if project_id:
-        client = storage.Client(project=project_id)
-    else:
-        client = storage.Client()
-
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-
-    # Download the file
-    blob.download_to_filename(local_file_path)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    with blob.open("r", encoding="utf-8") as f:
+        yield from f
 
 
 def _list_gcs_blobs(
-    bucket_name: str,
-    prefix: str,
-    project_id: Optional[str] = None,
+    storage_client: storage.Client, bucket_name: str, prefix: str
 ) -> list[str]:
     """List blobs in a GCS bucket with a given prefix
 
     Args:
+        storage_client: GCS client
         bucket_name: Name of the GCS bucket
         prefix: Prefix to filter blobs
-        project_id: GCP project ID. If None, uses default from environment
 
     Returns:
         List of blob names matching the prefix
     """
-    # Initialize the GCS client
-    if project_id:
-        client = storage.Client(project=project_id)
-    else:
-        client = storage.Client()
-
-    bucket = client.bucket(bucket_name)
+    bucket = storage_client.bucket(bucket_name)
     blobs = bucket.list_blobs(prefix=prefix)
 
     return [blob.name for blob in blobs]
 
 
-def gemini_batch(
-    prompts: Dict[str, str],
-    model: str = "gemini-2.5-flash",
-    temperature: float = 0.2,
-    gcs_bucket: Optional[str] = None,
-    project_id: Optional[str] = None,
-    location: str = "us-central1",
-    thinking_budget: int = 0,
+def _parse_gcs_results(
+    storage_client: storage.Client, gcs_uri: str, prompt_ids: Container[str]
 ) -> dict[str, str]:
-    """Runs a batch of prompts through the Gemini API
+    """Download and parse one output shard of a batch job, line by line"""
+    results = {}
+    for line in _iter_gcs_lines(storage_client, gcs_uri):
+        if line.strip():
+            custom_id, response_text = _parse_result_line(line)
+            if custom_id and custom_id in prompt_ids:
+                results[custom_id] = response_text
+    return results
+
+
+def download_batch_results(
+    storage_client: storage.Client,
+    bucket_name: str,
+    blob_names: list[str],
+    prompt_ids: Container[str],
+    max_workers: int = 8,
+) -> dict[str, str]:
+    """Download and parse the output shards of a batch job concurrently
+
+    Results are merged as each shard finishes, and the time taken by each
+    shard is printed.
 
     Args:
-        prompts: A dictionary {prompt_id: prompt} of prompts to run through the Gemini API
+        storage_client: GCS client, shared by all the downloads
+        bucket_name: Name of the GCS bucket
+        blob_names: Names of the output blobs (only .jsonl blobs are read)
+        prompt_ids: IDs of the prompts of the batch (other results are ignored)
+        max_workers: Maximum number of shards downloaded at the same time
+
+    Returns:
+        A dictionary {prompt_id: response} of the results found in the shards
+    """
+    shards = [name for name in blob_names if name.endswith(".jsonl")]
+
+    def download(blob_name):
+        start = time.perf_counter()
+        results = _parse_gcs_results(
+            storage_client, f"gs://{bucket_name}/{blob_name}", prompt_ids
+        )
+        return results, time.perf_counter() - start
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download, name): name for name in shards}
+        for future in as_completed(futures):
+            shard_results, duration = future.result()
+            results.update(shard_results)
+            print(
+                f"Downloaded {futures[future]}: {len(shard_results)} results "
+                f"in {duration:.2f}s"
+            )
+    return results
+
+
+def hash_batch_input(lines: Iterable[str]) -> str:
+    """Return the sha256 hash of the lines of a batch input"""
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def submit_batch_job(
+    client: genai.Client,
+    storage_client: storage.Client,
+    prompts: Mapping[str, str],
+    model: str,
+    temperature: float,
+    gcs_bucket: str,
+    thinking_budget: int = 0,
+    compress_input: bool = False,
+) -> dict:
+    """Upload the prompts to GCS and create a Vertex AI batch job
+
+    Args:
+        client: Gemini client for Vertex AI
+        storage_client: GCS client
+        prompts: A dictionary {prompt_id: prompt} of prompts to run
         model: The model to use for the Gemini API
         temperature: The temperature to use for the Gemini API
-        gcs_bucket: GCS bucket name to upload files to (required for Vertex AI batch API)
-        project_id: GCP project ID for GCS operations
-        location: Google Cloud region for Vertex AI (default: us-central1)
+        gcs_bucket: GCS bucket name for the input and output files
+        thinking_budget: Budget for thinking in tokens
+        compress_input: Whether to gzip the batch input during the upload
 
     Returns:
-        A dictionary {prompt_id: response} of responses from the Gemini API
+        A dictionary with the job name, state, input URI and output prefix
     """
-    if not gcs_bucket:
-        raise ValueError("gcs_bucket is required for Vertex AI batch processing")
+    # Create unique name for this batch (several jobs can start in a second)
+    timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+    # Stream the batch input (JSONL) to GCS as it is serialized
+    input_blob_name = f"batch_input_{timestamp}.jsonl"
+    src_uri = _upload_lines_to_gcs(
+        storage_client,
+        _iter_batch_requests(prompts, temperature, thinking_budget),
+        gcs_bucket,
+        input_blob_name,
+        compress=compress_input,
+    )
 
-    if not project_id:
-        raise ValueError("project_id is required for Vertex AI batch processing")
+    # Set up GCS output destination
+    output_prefix = f"batch_output_{timestamp}"
+    dest_uri = f"gs://{gcs_bucket}/{output_prefix}/"
+
+    print(f"Input uploaded to: {src_uri}")
+    print(f"Output will be written to: {dest_uri}")
+
+    # Create batch job
+    job = client.batches.create(
+        model=model,
+        src=src_uri,
+        config=CreateBatchJobConfig(dest=dest_uri),
+    )
+
+    print(f"Batch job created: {job.name}")
+    print(f"Initial state: {job.state}")
+    return {
+        "job_name": job.name,
+        "state": job.state.value if job.state else None,
+        "input_uri": src_uri,
+        "gcs_bucket": gcs_bucket,
+        "output_prefix": output_prefix,
+        "model": model,
+        "thinking_budget": thinking_budget,
+    }
+
+
+def wait_for_job(
+    client: genai.Client,
+    job_name: str,
+    poll_interval: float = 10,
+    max_poll_interval: float = 120,
+    deadline: Optional[float] = None,
+    on_poll: Optional[Callable] = None,
+):
+    """Poll a batch job until it completes
+
+    The delay between two polls starts at ``poll_interval`` and grows by half
+    at each poll up to ``max_poll_interval``: short jobs are noticed quickly
+    and long ones don't flood the API.
+
+    Args:
+        client: Gemini client for Vertex AI
+        job_name: Name of the batch job
+        poll_interval: Seconds before the second poll
+        max_poll_interval: Maximum number of seconds between two polls
+        deadline: Maximum number of seconds to wait (None: wait forever)
+        on_poll: Function called with the job after every poll
 
+    Returns:
+        The completed job
+    """
+    start_time = time.monotonic()
+    interval = poll_interval
+    while True:
+        job = client.batches.get(name=job_name)
+        if on_poll is not None:
+            on_poll(job)
+        if job.state in COMPLETED_STATES:
+            print(f"Final job state: {job.state}")
+            return job
+        elapsed = time.monotonic() - start_time
+        if deadline is not None and elapsed + interval > deadline:
+            raise TimeoutError(
+                f"Batch job {job_name} still {job.state} after {elapsed:.0f}s"
+            )
+        print(f"Job state: {job.state}, next check in {interval:.0f}s...")
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_poll_interval)
+
+
+def _vertex_client(project_id: str, location: str = "us-central1") -> genai.Client:
     # Set the Google Cloud project environment variable
     os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
 
     # Initialize the Gemini client for Vertex AI with project and location
-    client = genai.Client(
+    return genai.Client(
         http_options=HttpOptions(api_version="v1"),
         vertexai=True,
         project=project_id,
         location=location,
     )
 
-    # Create unique timestamp for this batch
-    timestamp = int(time.time())
-
-    # Create a temporary directory for batch files
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        input_file = temp_path / "batch_input.jsonl"
-
-        # Prepare the batch input file in JSONL format
-        requests = "\n".join(
-            [
-                _create_batch_request(
-                    prompt_id, prompt_text, temperature, thinking_budget
-                )
-                for prompt_id, prompt_text in prompts.items()
-            ]
-        )
-        input_file.write_text(requests)
-
-        # Upload input file to GCS
-        input_blob_name = f"batch_input_{timestamp}.jsonl"
-        src_uri = _upload_to_gcs(
-            str(input_file),
-            gcs_bucket,
-            input_blob_name,
-            project_id,
-        )
 
-        # Set up GCS output destination
-        output_prefix = f"batch_output_{timestamp}"
-        dest_uri = f"gs://{gcs_bucket}/{output_prefix}/"
+def vertex_clients(
+    project_id: str, location: str = "us-central1"
+) -> tuple[genai.Client, storage.Client]:
+    """Return the Gemini client (Vertex AI) and GCS client of a project"""
+    return _vertex_client(project_id, location), storage.Client(project=project_id)
+
 
-        print(f"Input uploaded to: {src_uri}")
-        print(f"Output will be written to: {dest_uri}")
+def submit_batch(
+    client: genai.Client,
+    storage_client: storage.Client,
+    prompts: Mapping[str, str],
+    model: str,
+    temperature: float,
+    gcs_bucket: str,
+    thinking_budget: int = 0,
+    compress_input: bool = False,
+    manifest: Optional[JobManifest] = None,
+    job_info: Optional[dict] = None,
+) -> tuple[Optional[str], dict]:
+    """Submit a batch job, unless the manifest has a live job for this input
 
-        # Create batch job
-        job = client.batches.create(
-            model=model,
-            src=src_uri,
-            config=CreateBatchJobConfig(dest=dest_uri),
+    Args:
+        client: Gemini client for Vertex AI
+        storage_client: GCS client
+        prompts: A dictionary {prompt_id: prompt} of prompts to run
+        model: The model to use for the Gemini API
+        temperature: The temperature to use for the Gemini API
+        gcs_bucket: GCS bucket name for the input and output files
+        thinking_budget: Budget for thinking in tokens
+        compress_input: Whether to gzip the batch input during the upload
+        manifest: Record of the submitted jobs (see ``gemini_batch``)
+        job_info: Information recorded with the job in the manifest
+
+    Returns:
+        A tuple (key, entry) with the key of the job in the manifest (None
+        without manifest) and its entry (job name, state, GCS locations...)
+    """
+    job_info = dict(job_info or {})
+    key = None
+    entry = None
+    if manifest is not None:
+        input_hash = hash_batch_input(
+            _iter_batch_requests(prompts, temperature, thinking_budget)
         )
+        key = job_key(input_hash, job_info.get("language"), job_info.get("date"))
+        entry = manifest.get(key)
+
+    if entry is not None and entry["state"] not in RESUBMIT_STATES:
+        print(f"Resuming batch job {entry['job_name']} ({entry['state']})")
+        return key, entry
+
+    entry = submit_batch_job(
+        client,
+        storage_client,
+        prompts,
+        model,
+        temperature,
+        gcs_bucket,
+        thinking_budget,
+        compress_input,
+    )
+    if manifest is not None:
+        # A failed job of the same input is replaced, with its failure mark
+        manifest.remove(key)
+        manifest.record(key, **job_info, **entry)
+    return key, entry
+
+
+def collect_batch(
+    client: genai.Client,
+    storage_client: storage.Client,
+    entry: dict,
+    prompt_ids: Iterable[str],
+    key: Optional[str] = None,
+    manifest: Optional[JobManifest] = None,
+    poll_deadline: Optional[float] = None,
+    download_workers: int = 8,
+):
+    """Wait for a submitted batch job and return its results
 
-        print(f"Batch job created: {job.name}")
-        print(f"Initial state: {job.state}")
+    Args:
+        client: Gemini client for Vertex AI
+        storage_client: GCS client
+        entry: Entry of the job, as returned by ``submit_batch``
+        prompt_ids: IDs of the prompts of the batch
+        key: Key of the job in the manifest, to record its state
+        manifest: Record of the submitted jobs
+        poll_deadline: Maximum number of seconds to wait for the job
+        download_workers: Maximum number of output shards downloaded at once
 
-        # Wait for job completion
-        completed_states = {
-            JobState.JOB_STATE_SUCCEEDED,
-            JobState.JOB_STATE_FAILED,
-            JobState.JOB_STATE_CANCELLED,
-            JobState.JOB_STATE_PAUSED,
-        }
+    Returns:
+        A tuple (results, job) where results is a dictionary {prompt_id: response}
+    """
+    prompt_ids = set(prompt_ids)
+
+    def record_state(job):
+        if manifest is not None:
+            manifest.record(key, state=job.state.value if job.state else None)
 
-        while job.state not in completed_states:
-            print(f"Job state: {job.state}, waiting...")
-            time.sleep(10)  # Check every 10 seconds
-            job = client.batches.get(name=job.name)
+    job = wait_for_job(
+        client, entry["job_name"], deadline=poll_deadline, on_poll=record_state
+    )
+
+    if job.state != JobState.JOB_STATE_SUCCEEDED:
+        raise RuntimeError(f"Batch job failed with state: {job.state}")
+
+    gcs_bucket = entry["gcs_bucket"]
+    output_prefix = entry["output_prefix"]
 
-        print(f"Final job state: {job.state}")
+    # List the output files in GCS
+    output_blobs = _list_gcs_blobs(storage_client, gcs_bucket, output_prefix)
 
-        if job.state != JobState.JOB_STATE_SUCCEEDED:
-            raise RuntimeError(f"Batch job failed with state: {job.state}")
+    if not output_blobs:
+        raise RuntimeError(f"No output files found with prefix: {output_prefix}")
 
-        # List and download output files from GCS
-        output_blobs = _list_gcs_blobs(gcs_bucket, output_prefix, project_id)
+    print(f"Found {len(output_blobs)} output files")
 
-        if not output_blobs:
-            raise RuntimeError(f"No output files found with prefix: {output_prefix}")
+    # Download and parse the output files concurrently
+    results = download_batch_results(
+        storage_client,
+        gcs_bucket,
+        output_blobs,
+        prompt_ids,
+        max_workers=download_workers,
+    )
+
+    # Ensure all prompts have a result (even if empty)
+    for prompt_id in prompt_ids:
+        if prompt_id not in results:
+            results[prompt_id] = ""
 
-        print(f"Found {len(output_blobs)} output files")
+    print(f"Successfully processed {len(results)} results")
+    return results, job
 
-        # Process batch results
-        results = {}
 
-        for blob_name in output_blobs:
-            if blob_name.endswith(".jsonl"):
-                # Download the output file
-                output_file = temp_path / f"output_{blob_name.split('/')[-1]}"
-                gcs_output_uri = f"gs://{gcs_bucket}/{blob_name}"
+def gemini_batch(
+    prompts: Dict[str, str],
+    model: str = "gemini-2.5-flash",
+    temperature: float = 0.2,
+    gcs_bucket: Optional[str] = None,
+    project_id: Optional[str] = None,
+    location: str = "us-central1",
+    thinking_budget: int = 0,
+    compress_input: bool = False,
+    download_workers: int = 8,
+    storage_client: Optional[storage.Client] = None,
+    manifest: Optional[JobManifest] = None,
+    job_info: Optional[dict] = None,
+    poll_deadline: Optional[float] = None,
+) -> dict[str, str]:
+    """Runs a batch of prompts through the Gemini API
 
-                print(f"Downloading: {gcs_output_uri}")
-                _download_from_gcs(gcs_output_uri, str(output_file), project_id)
+    Args:
+        prompts: A dictionary {prompt_id: prompt} of prompts to run through the Gemini API
+        model: The model to use for the Gemini API
+        temperature: The temperature to use for the Gemini API
+        gcs_bucket: GCS bucket name to upload files to (required for Vertex AI batch API)
+        project_id: GCP project ID for GCS operations
+        location: Google Cloud region for Vertex AI (default: us-central1)
+        compress_input: Whether to gzip the batch input during the upload
+        download_workers: Maximum number of output shards downloaded at once
+        storage_client: GCS client to use (default: a client for project_id)
+        manifest: Record of the submitted jobs. If the same input (same hash)
+          was already submitted for the same language and date, the function
+          waits for that job instead of submitting a new one.
+        job_info: Information recorded with the job in the manifest. Its
+          "language" and "date" are part of the key of the job.
+        poll_deadline: Maximum number of seconds to wait for the job. The job
+          keeps running after a timeout and can be resumed with the manifest.
 
-                # Process the downloaded file
-                with open(output_file, "r") as f:
-                    for line in f:
-                        if line.strip():
-                            custom_id, response_text = _parse_result_line(line)
-                            if custom_id and custom_id in prompts:
-                                results[custom_id] = response_text
+    Returns:
+        A dictionary {prompt_id: response} of responses from the Gemini API
+    """
+    if not gcs_bucket:
+        raise ValueError("gcs_bucket is required for Vertex AI batch processing")
 
-        # Ensure all prompts have a result (even if empty)
-        for prompt_id in prompts.keys():
-            if prompt_id not in results:
-                results[prompt_id] = ""
+    if not project_id:
+        raise ValueError("project_id is required for Vertex AI batch processing")
 
-        print(f"Successfully processed {len(results)} results")
-        return results, job
+    client = _vertex_client(project_id, location)
+    if storage_client is None:
+        storage_client = storage.Client(project=project_id)
+
+    key, entry = submit_batch(
+        client,
+        storage_client,
+        prompts,
+        model,
+        temperature,
+        gcs_bucket,
+        thinking_budget,
+        compress_input,
+        manifest=manifest,
+        job_info=job_info,
+    )
+    results, job = collect_batch(
+        client,
+        storage_client,
+        entry,
+        prompts,
+        key=key,
+        manifest=manifest,
+        poll_deadline=poll_deadline,
+        download_workers=download_workers,
+    )
+    return {prompt_id: results[prompt_id] for prompt_id in prompts}, job
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+TOKEN_KINDS = ("input", "output", "thoughts")
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of values (0 for an empty list)."""
+    if not values:
+        return 0
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[rank]
+
+
+class MetricsCollector:
+    """Records one structured event per LLM call of a command run.
+
+    ``record`` is meant to be used as the ``on_call`` callback of
+    ``run_gemini``/``run_openai``. Each event holds the provider, model,
+    latency, input/output/thoughts tokens, cache status ("hit", "miss" or None
+    when there is no cache) and error (None for successful calls), plus the
+    labels of the collector (e.g. the command and language of the run).
+
+    Args:
+        labels: Labels added to every event, e.g. {"command": "test"}
+    """
+
+    def __init__(self, labels: Optional[dict] = None):
+        self.labels = dict(labels or {})
+        self.label_names = list(self.labels)
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, event: dict):
+        """Add the event of a call (thread-safe)."""
+        event = {"timestamp": time.time(), **self.labels, **event}
+        with self._lock:
+            self.events.append(event)
+
+    def merge(self, other: "MetricsCollector"):
+        """Add the events of another collector (e.g. of another language of the
+        same command). They keep their labels, and are aggregated separately."""
+        with self._lock:
+            self.events.extend(other.events)
+            for name in other.label_names:
+                if name not in self.label_names:
+                    self.label_names.append(name)
+
+    def aggregate(self) -> list[dict]:
+        """Return the statistics of the calls, per labels, provider and model."""
+        groups = {}
+        for event in self.events:
+            labels = tuple(event.get(name) for name in self.label_names)
+            key = (labels, event.get("provider"), event.get("model"))
+            groups.setdefault(key, []).append(event)
+        stats = []
+        for (labels, provider, model), events in groups.items():
+            latencies = [event["latency"] for event in events]
+            stats.append(
+                {
+                    **dict(zip(self.label_names, labels)),
+                    "provider": provider,
+                    "model": model,
+                    "calls": len(events),
+                    "errors": sum(event.get("error") is not None for event in events),
+                    "cache_hits": sum(event.get("cache") == "hit" for event in events),
+                    "latency_p50": percentile(latencies, 50),
+                    "latency_p95": percentile(latencies, 95),
+                    "latency_total": sum(latencies),
+                    **{
+                        f"{kind}_tokens": sum(e[f"{kind}_tokens"] for e in events)
+                        for kind in TOKEN_KINDS
+                    },
+                }
+            )
+        return stats
+
+    def summary(self) -> str:
+        """Return a short human-readable summary, one line per model."""
+        lines = []
+        for stats in self.aggregate():
+            # Name the labels that vary between events, e.g. the language
+            prefix = "".join(
+                f"{stats[name]} "
+                for name in self.label_names
+                if name not in self.labels
+            )
+            lines.append(
+                f"{prefix}{stats['model']}: {stats['calls']} calls "
+                f"({stats['cache_hits']} cached, {stats['errors']} errors), "
+                f"latency p50 {stats['latency_p50']:.2f}s "
+                f"p95 {stats['latency_p95']:.2f}s, tokens "
+                f"{stats['input_tokens']} in, {stats['output_tokens']} out, "
+                f"{stats['thoughts_tokens']} thoughts"
+            )
+        return "\n".join(lines) if lines else "No LLM calls recorded"
+
+    def to_jsonl(self) -> str:
+        """Return the events as JSON lines."""
+        return "".join(json.dumps(event) + "\n" for event in self.events)
+
+    def to_prometheus(self) -> str:
+        """Return the aggregated statistics in the Prometheus text format."""
+        metrics = {
+            "verbiage_llm_calls_total": ("counter", "Number of LLM calls", []),
+            "verbiage_llm_errors_total": ("counter", "Number of failed calls", []),
+            "verbiage_llm_cache_hits_total": ("counter", "Cached responses", []),
+            "verbiage_llm_tokens_total": ("counter", "Tokens used", []),
+            "verbiage_llm_latency_seconds": ("summary", "Latency of the calls", []),
+        }
+        for stats in self.aggregate():
+            labels = {
+                k: v for k, v in stats.items() if isinstance(v, str) or v is None
+            }
+            metrics["verbiage_llm_calls_total"][2].append((labels, stats["calls"]))
+            metrics["verbiage_llm_errors_total"][2].append((labels, stats["errors"]))
+            metrics["verbiage_llm_cache_hits_total"][2].append(
+                (labels, stats["cache_hits"])
+            )
+            for kind in TOKEN_KINDS:
+                metrics["verbiage_llm_tokens_total"][2].append(
+                    ({**labels, "kind": kind}, stats[f"{kind}_tokens"])
+                )
+            latency = metrics["verbiage_llm_latency_seconds"][2]
+            latency.append(({**labels, "quantile": "0.5"}, stats["latency_p50"]))
+            latency.append(({**labels, "quantile": "0.95"}, stats["latency_p95"]))
+            latency.append(({**labels, "__suffix__": "_sum"}, stats["latency_total"]))
+            latency.append(({**labels, "__suffix__": "_count"}, stats["calls"]))
+
+        lines = []
+        for name, (metric_type, description, samples) in metrics.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                labels = dict(labels)
+                suffix = labels.pop("__suffix__", "")
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path | str):
+        """Write the metrics to a file: Prometheus text format if the name ends
+        with .prom, JSON lines of the events otherwise."""
+        path = Path(path)
+        if path.suffix == ".prom":
+            path.write_text(self.to_prometheus())
+        else:
+            path.write_text(self.to_jsonl())
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    formatted = ",".join(
+        f'{key}="{_escape(value)}"' for key, value in labels.items() if value
+    )
+    return f"{{{formatted}}}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
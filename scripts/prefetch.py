@@ -0,0 +1,137 @@
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+def rank_candidates(
+    playable: list[str],
+    drawable: list[str],
+    frequencies: Optional[dict[str, float]] = None,
+) -> list[str]:
+    """Order the playable words from most to least likely to be guessed.
+
+    Words are ranked by their frequency (see ``WordIndex.frequencies``). The
+    words without a frequency come after, the drawable ones (the frequent
+    ones) first, each group in a fixed shuffled order: the word lists are
+    alphabetical, and their first words are no likelier guesses than others.
+    """
+    frequencies = frequencies or {}
+    drawable_set = set(drawable)
+    return sorted(
+        playable,
+        key=lambda w: (
+            -frequencies.get(w, 0),
+            w not in drawable_set,
+            zlib.crc32(w.encode()),
+        ),
+    )
+
+
+class CluePrefetcher:
+    """Generates clues in the background for the likely next guesses.
+
+    Clues are only requested while the prefetcher is resumed (i.e. while the
+    game waits for the player), at most ``max_workers`` at a time and at most
+    ``budget`` in total for the session. Clues of the words already played are
+    kept too, so repeated guesses are answered instantly.
+
+    Args:
+        generate_clue: Function returning the clue for a guess
+        candidates: Guesses to prefetch, most likely first
+        budget: Maximum number of clues generated in the background
+        max_workers: Maximum number of clues generated concurrently
+    """
+
+    def __init__(
+        self,
+        generate_clue: Callable[[str], str],
+        candidates: list[str],
+        budget: int = 50,
+        max_workers: int = 4,
+    ):
+        self.generate_clue = generate_clue
+        self.candidates = list(candidates)
+        self.budget = budget
+        self.submitted = 0
+        self.clues: dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._slots = threading.Semaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        threading.Thread(target=self._feed, daemon=True).start()
+
+    def _feed(self):
+        """Submit the candidates one by one, whenever active and a worker is free."""
+        for word in self.candidates:
+            if self.submitted >= self.budget:
+                return
+            while True:
+                self._active.wait()
+                self._slots.acquire()
+                if self._stopped.is_set():
+                    return
+                with self._lock:
+                    # The game may have paused while this waited for a worker
+                    if not self._active.is_set():
+                        self._slots.release()
+                        continue
+                    if word not in self.clues:
+                        future = self._executor.submit(self.generate_clue, word)
+                        future.add_done_callback(lambda _: self._slots.release())
+                        self.clues[word] = future
+                        self.submitted += 1
+                    else:
+                        self._slots.release()
+                    break
+
+    def resume(self):
+        """Allow background generation (call before waiting for the player)."""
+        self._active.set()
+
+    def pause(self):
+        """Stop starting new requests (call when the player has answered)."""
+        with self._lock:
+            self._active.clear()
+
+    def get(self, word: str) -> Optional[str]:
+        """Return the prefetched clue for this guess (waiting if in flight),
+        or None if it wasn't prefetched or its generation failed."""
+        with self._lock:
+            future = self.clues.get(word)
+        try:
+            clue = None if future is None else future.result()
+        except Exception:
+            clue = None
+        if clue is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return clue
+
+    def remember(self, word: str, clue: str):
+        """Keep the clue of a played word for the rest of the session."""
+        future = Future()
+        future.set_result(clue)
+        with self._lock:
+            self.clues[word] = future
+
+    def summary(self) -> str:
+        """Return a one-line summary of the prefetch usage in this session."""
+        total = self.hits + self.misses
+        hit_rate = 100 * self.hits / total if total else 0
+        return (
+            f"Prefetch: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.0f}% hit rate), {self.submitted}/{self.budget} "
+            "clues generated in the background"
+        )
+
+    def stop(self):
+        """Stop the background generation and discard pending requests."""
+        self._stopped.set()
+        self._active.set()
+        self._slots.release()
+        self._executor.shutdown(wait=False, cancel_futures=True)
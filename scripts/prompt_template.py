@@ -0,0 +1,88 @@
+import re
+from pathlib import Path
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+
+class PromptTemplate:
+    """A prompt with ``{{placeholder}}`` fields, parsed once and rendered fast.
+
+    The text is split into literal segments and placeholder names, so
+    rendering only joins precomputed segments. Rendering fails if a placeholder
+    is left unfilled (values for placeholders absent from the text are ignored).
+
+    Args:
+        text: The template text
+        name: Name of the template, used in error messages
+    """
+
+    def __init__(self, text: str, name: str = "template"):
+        self.name = name
+        pieces = PLACEHOLDER_PATTERN.split(text)
+        # Even pieces are literals, odd pieces are placeholder names
+        self.literals = pieces[0::2]
+        self.fields = pieces[1::2]
+        self._compile()
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "PromptTemplate":
+        """Read and parse a template file."""
+        path = Path(path)
+        return cls(path.read_text(), name=path.stem)
+
+    @classmethod
+    def _from_parts(cls, literals, fields, name):
+        template = cls.__new__(cls)
+        template.name = name
+        template.literals = literals
+        template.fields = fields
+        template._compile()
+        return template
+
+    def _compile(self):
+        """Precompute the (placeholder, following literal) pairs to render."""
+        self._head = self.literals[0]
+        self._pairs = list(zip(self.fields, self.literals[1:]))
+
+    @property
+    def placeholders(self) -> set[str]:
+        return set(self.fields)
+
+    @property
+    def text(self) -> str:
+        """The template text, with the ``{{placeholder}}`` fields left unfilled."""
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append("{{" + field + "}}" + literal)
+        return "".join(parts)
+
+    def render(self, **values: str) -> str:
+        """Return the text with all the placeholders replaced by their values."""
+        try:
+            if len(self._pairs) == 1:  # e.g. the clue prompt of a secret word
+                field, literal = self._pairs[0]
+                return self._head + values[field] + literal
+            parts = [self._head]
+            for field, literal in self._pairs:
+                parts.append(values[field])
+                parts.append(literal)
+            return "".join(parts)
+        except KeyError:
+            missing = sorted(self.placeholders.difference(values))
+            raise ValueError(f"Unfilled placeholders in {self.name}: {missing}")
+
+    def partial(self, **values: str) -> "PromptTemplate":
+        """Return a template with some of the placeholders filled in.
+
+        The filled values are merged into the literal segments, so rendering
+        the remaining placeholders only joins a few segments.
+        """
+        literals = [self.literals[0]]
+        fields = []
+        for field, literal in zip(self.fields, self.literals[1:]):
+            if field in values:
+                literals[-1] += values[field] + literal
+            else:
+                fields.append(field)
+                literals.append(literal)
+        return self._from_parts(literals, fields, self.name)
@@ -0,0 +1,428 @@
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import zlib
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterable
+
+from file_utils import atomic_write_json
+from word_index import WordIndex
+
+PUZZLES_DIR = Path(__file__).parent.parent / "verbiage" / "public" / "puzzles"
+SOLUTION_INDEX_FILE = Path(__file__).parent / "solution_index.json"
+COMPACT_MAGIC = b"VBP1"
+GUESS_MARK = "\x01"  # Stands for the guess in the clues of compact puzzles
+
+
+def puzzle_path(language: str, date: str, puzzles_dir: Path = PUZZLES_DIR) -> Path:
+    """Return the path of the published puzzle for this language and date."""
+    return Path(puzzles_dir) / language / f"{language}_{date}.json.gz"
+
+
+def resolve_puzzle_path(language: str, puzzle: str) -> Path:
+    """Return the puzzle file designated by a date (YYYY-MM-DD) or a path."""
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", puzzle):
+        path = puzzle_path(language, puzzle)
+    else:
+        path = Path(puzzle)
+    if not path.exists():
+        raise FileNotFoundError(f"No puzzle file at {path}")
+    return path
+
+
+class LazyPrompts(Mapping):
+    """A read-only {prompt_id: prompt} mapping rendering each prompt when read.
+
+    The prompts of a month of puzzles take hundreds of MB, so a batch input is
+    hashed and written from this mapping one prompt at a time, and never held
+    in memory as a whole.
+
+    Args:
+        prompt_ids: IDs of the prompts, in batch order
+        render: Function returning the prompt of an ID
+    """
+
+    def __init__(self, prompt_ids: Iterable[str], render: Callable[[str], str]):
+        self._prompt_ids = dict.fromkeys(prompt_ids)
+        self._render = render
+
+    def __getitem__(self, prompt_id: str) -> str:
+        if prompt_id not in self._prompt_ids:
+            raise KeyError(prompt_id)
+        return self._render(prompt_id)
+
+    def __contains__(self, prompt_id) -> bool:
+        return prompt_id in self._prompt_ids
+
+    def __iter__(self):
+        return iter(self._prompt_ids)
+
+    def __len__(self) -> int:
+        return len(self._prompt_ids)
+
+
+def pack_prompts(prompts_by_puzzle: dict[str, Mapping[str, str]]) -> LazyPrompts:
+    """Merge the prompts of several puzzles into one batch.
+
+    The ID of each prompt is "<puzzle_id>/<guess>", e.g. "en_2025-06-01/CRANE".
+    The prompts are read from ``prompts_by_puzzle`` when the batch is.
+    """
+
+    def render(prompt_id):
+        puzzle_id, guess = prompt_id.rsplit("/", 1)
+        return prompts_by_puzzle[puzzle_id][guess]
+
+    return LazyPrompts(
+        (
+            f"{puzzle_id}/{guess}"
+            for puzzle_id, prompts in prompts_by_puzzle.items()
+            for guess in prompts
+        ),
+        render,
+    )
+
+
+def unpack_results(results: dict[str, str]) -> dict[str, dict[str, str]]:
+    """Split the results of a packed batch into {puzzle_id: {guess: clue}}."""
+    results_by_puzzle = {}
+    for prompt_id, response in results.items():
+        puzzle_id, guess = prompt_id.rsplit("/", 1)
+        results_by_puzzle.setdefault(puzzle_id, {})[guess] = response
+    return results_by_puzzle
+
+
+def read_puzzle(path: Path | str) -> dict[str, str]:
+    """Read a puzzle file {guess: clue, ..., "solution": word} (.json, .json.gz
+    or compact .vbp)"""
+    path = Path(path)
+    if path.suffix == ".vbp":
+        data = path.read_bytes()
+        return decode_compact_puzzle(data, *_compact_puzzle_lists(data))
+    if path.name.endswith(".gz"):
+        with gzip.open(path, "rt") as f:
+            return json.load(f)
+    return json.loads(path.read_text())
+
+
+def write_puzzle(puzzle: dict[str, str], path: Path | str):
+    """Write a puzzle file, gzip-compressed if the name ends with .json.gz"""
+    path = Path(path)
+    if path.name.endswith(".json.gz"):
+        with gzip.open(path, "wt") as f:
+            json.dump(puzzle, f)
+    else:
+        with open(path, "w") as f:
+            json.dump(puzzle, f)
+
+
+def clue_dictionary_path(language: str, puzzles_dir: Path = PUZZLES_DIR) -> Path:
+    """Return the path of the preset dictionary of the compact puzzles."""
+    return Path(puzzles_dir) / language / f"{language}_clues.zdict"
+
+
+def load_clue_dictionary(language: str, puzzles_dir: Path = PUZZLES_DIR) -> bytes:
+    """Return the preset dictionary of the compact puzzles of a language."""
+    path = clue_dictionary_path(language, puzzles_dir)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No clue dictionary at {path}, train it with "
+            f"`python game.py train-dictionary --language {language}`"
+        )
+    return path.read_bytes()
+
+
+def train_clue_dictionary(
+    puzzles: Iterable[dict[str, str]], size: int = 32 * 1024, sample: int = 5000
+) -> bytes:
+    """Build a zlib preset dictionary from the clues of past puzzles.
+
+    The dictionary is made of the word sequences that appear most often in the
+    clues ("THE WORD is often associated with", "Just like a..."), weighted by
+    their length. The most useful ones go last, as zlib encodes references to
+    the end of the dictionary more cheaply.
+
+    Args:
+        puzzles: Past puzzles {guess: clue, ..., "solution": word}
+        size: Maximum size of the dictionary in bytes (zlib uses at most 32 KB)
+        sample: Number of clues sampled to count the word sequences
+    """
+    clues = [
+        clue.replace(guess, GUESS_MARK)
+        for puzzle in puzzles
+        for guess, clue in puzzle.items()
+        if guess != "solution"
+    ]
+    clues = random.Random(0).sample(clues, min(sample, len(clues)))
+    counts = Counter()
+    for clue in clues:
+        words = clue.split(" ")
+        for length in range(2, 7):
+            for start in range(len(words) - length + 1):
+                counts[" ".join(words[start : start + length])] += 1
+
+    phrases = []
+    dictionary = ""
+    ranked = sorted(counts.items(), key=lambda item: item[1] * len(item[0]))
+    for phrase, count in reversed(ranked):
+        if count < 2 or len(dictionary) + len(phrase) + 1 > size:
+            continue
+        if phrase not in dictionary:
+            phrases.append(phrase)
+            dictionary += phrase + " "
+    return " ".join(reversed(phrases)).encode("utf-8")[-size:]
+
+
+def _short_hash(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()[:8]
+
+
+def encode_compact_puzzle(
+    puzzle: dict[str, str], playable: list[str], zdict: bytes
+) -> bytes:
+    """Encode a puzzle in the compact format.
+
+    The guesses are stored as a bitmap over the ``playable`` list of the
+    language (guesses missing from the list are stored as words). In each
+    clue the guess is replaced by a one-character mark, and the clues are
+    compressed with the preset dictionary ``zdict``. The header
+    holds short hashes of the list and dictionary, to check that the reader
+    uses the same ones.
+    """
+    bitmap = bytearray((len(playable) + 7) // 8)
+    playable_clues = []
+    for index, guess in enumerate(playable):
+        if guess in puzzle:
+            bitmap[index // 8] |= 1 << (index % 8)
+            playable_clues.append(puzzle[guess].replace(guess, GUESS_MARK))
+    playable_set = set(playable)
+    extra_guesses = [g for g in puzzle if g != "solution" and g not in playable_set]
+    fields = [puzzle["solution"], str(len(extra_guesses)), *extra_guesses]
+    fields += playable_clues
+    fields += [puzzle[guess].replace(guess, GUESS_MARK) for guess in extra_guesses]
+    payload = bytes(bitmap) + "\0".join(fields).encode("utf-8")
+
+    compressor = zlib.compressobj(level=9, zdict=zdict)
+    data = compressor.compress(payload) + compressor.flush()
+    playable_hash = _short_hash("\n".join(playable).encode("utf-8"))
+    return COMPACT_MAGIC + _short_hash(zdict) + playable_hash + data
+
+
+def decode_compact_puzzle(
+    data: bytes, playable: list[str], zdict: bytes
+) -> dict[str, str]:
+    """Decode a puzzle encoded with ``encode_compact_puzzle``."""
+    if data[:4] != COMPACT_MAGIC:
+        raise ValueError("Not a compact puzzle")
+    if data[4:12] != _short_hash(zdict):
+        raise ValueError("The puzzle was compressed with another dictionary")
+    if data[12:20] != _short_hash("\n".join(playable).encode("utf-8")):
+        raise ValueError("The puzzle was encoded with another playable word list")
+
+    decompressor = zlib.decompressobj(zdict=zdict)
+    payload = decompressor.decompress(data[20:]) + decompressor.flush()
+    bitmap_size = (len(playable) + 7) // 8
+    bitmap = payload[:bitmap_size]
+    fields = payload[bitmap_size:].decode("utf-8").split("\0")
+    solution, extras_count = fields[0], int(fields[1])
+    extra_guesses = fields[2 : 2 + extras_count]
+    guesses = [
+        guess
+        for index, guess in enumerate(playable)
+        if bitmap[index // 8] >> (index % 8) & 1
+    ]
+    clues = fields[2 + extras_count :]
+    puzzle = {
+        guess: clue.replace(GUESS_MARK, guess)
+        for guess, clue in zip(guesses + extra_guesses, clues)
+    }
+    puzzle["solution"] = solution
+    return puzzle
+
+
+def _compact_puzzle_lists(
+    data: bytes, puzzles_dir: Path = PUZZLES_DIR
+) -> tuple[list[str], bytes]:
+    """Return the playable list and dictionary a compact puzzle was encoded
+    with, found by the hashes of its header among those of the languages."""
+    for language in ["en", "fr"]:
+        path = clue_dictionary_path(language, puzzles_dir)
+        if not path.exists() or _short_hash(path.read_bytes()) != data[4:12]:
+            continue
+        word_index = WordIndex(language)
+        for size in word_index.sizes:
+            playable = word_index[size].playable
+            if _short_hash("\n".join(playable).encode("utf-8")) == data[12:20]:
+                return playable, path.read_bytes()
+    raise ValueError(
+        "No clue dictionary and playable word list match this compact puzzle"
+    )
+
+
+def write_compact_puzzle(
+    puzzle: dict[str, str], path: Path | str, playable: list[str], zdict: bytes
+):
+    """Write a puzzle file in the compact format (see encode_compact_puzzle)"""
+    Path(path).write_bytes(encode_compact_puzzle(puzzle, playable, zdict))
+
+
+def read_compact_puzzle(
+    path: Path | str, playable: list[str], zdict: bytes
+) -> dict[str, str]:
+    """Read a puzzle file in the compact format"""
+    return decode_compact_puzzle(Path(path).read_bytes(), playable, zdict)
+
+
+def guess_shard(guess: str, shard_by: str = "hash", shard_count: int = 32) -> str:
+    """Return the shard of a guess: its first letter, or a bucket of the CRC32
+    of the guess (easy to compute in the web app too)."""
+    if shard_by == "letter":
+        return guess[0]
+    return str(zlib.crc32(guess.encode("utf-8")) % shard_count)
+
+
+def solution_hash(solution: str) -> str:
+    return hashlib.sha256(solution.encode("utf-8")).hexdigest()
+
+
+def write_sharded_puzzle(
+    puzzle: dict[str, str],
+    directory: Path | str,
+    shard_by: str = "hash",
+    shard_count: int = 32,
+):
+    """Write a puzzle as small .json.gz shards of clues plus a header.json.
+
+    The header holds the hash of the solution (so a winning guess can be
+    recognized without any shard), the shard of the solution, and the shard
+    map {shard: file}, so a client only fetches the shard of each guess.
+
+    Args:
+        puzzle: The puzzle {guess: clue, ..., "solution": word}
+        directory: Directory of the shards, e.g. ".../en/en_2025-06-01"
+        shard_by: "hash" (buckets of the CRC32 of the guess) or "letter"
+        shard_count: Number of hash buckets
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    shards = {}
+    for guess, clue in puzzle.items():
+        if guess != "solution":
+            shard = guess_shard(guess, shard_by, shard_count)
+            shards.setdefault(shard, {})[guess] = clue
+    solution = puzzle["solution"]
+    solution_shard = guess_shard(solution, shard_by, shard_count)
+    shards.setdefault(solution_shard, {})["solution"] = solution
+
+    shard_files = {}
+    for shard, clues in sorted(shards.items()):
+        shard_files[shard] = f"shard_{shard}.json.gz"
+        write_puzzle(clues, directory / shard_files[shard])
+    header = {
+        "version": 1,
+        "word_size": len(solution),
+        "solution_hash": solution_hash(solution),
+        "solution_shard": solution_shard,
+        "shard_by": shard_by,
+        "shard_count": shard_count,
+        "shards": shard_files,
+    }
+    (directory / "header.json").write_text(json.dumps(header))
+
+
+class ShardedPuzzle:
+    """Reader of a sharded puzzle, fetching the shards on demand.
+
+    Args:
+        directory: Directory of the puzzle (with its header.json)
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        header_path = self.directory / "header.json"
+        self.header = json.loads(header_path.read_text())
+        self.bytes_fetched = header_path.stat().st_size
+        self.shards = {}
+
+    def _shard(self, shard: str) -> dict[str, str]:
+        if shard not in self.shards:
+            filename = self.header["shards"].get(shard)
+            if filename is None:
+                self.shards[shard] = {}
+            else:
+                path = self.directory / filename
+                self.bytes_fetched += path.stat().st_size
+                self.shards[shard] = read_puzzle(path)
+        return self.shards[shard]
+
+    def shard_of(self, guess: str) -> str:
+        """Return the shard holding the clue of this guess."""
+        return guess_shard(guess, self.header["shard_by"], self.header["shard_count"])
+
+    def is_solution(self, guess: str) -> bool:
+        return solution_hash(guess) == self.header["solution_hash"]
+
+    def clue(self, guess: str) -> str | None:
+        """Return the clue of a guess (None if it's not a playable word)."""
+        return self._shard(self.shard_of(guess)).get(guess)
+
+    @property
+    def solution(self) -> str:
+        """The solution (fetches the shard where it is stored)."""
+        return self._shard(self.header["solution_shard"])["solution"]
+
+
+class SolutionIndex:
+    """The solutions of the published puzzles, {language: {date: solution}}.
+
+    The index is a small JSON file updated each time a puzzle is written, so
+    the past solutions are known without opening every puzzle of the archive.
+    It is rebuilt from the archive if the file doesn't exist.
+
+    Args:
+        path: Path of the JSON file of the index
+        puzzles_dir: Directory of the puzzle archive (one folder per language)
+    """
+
+    def __init__(
+        self, path: Path | str = SOLUTION_INDEX_FILE, puzzles_dir: Path = PUZZLES_DIR
+    ):
+        self.path = Path(path)
+        self.puzzles_dir = Path(puzzles_dir)
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.index = json.loads(self.path.read_text())
+        else:
+            self.rebuild()
+
+    def rebuild(self):
+        """Rebuild the index from the puzzle files of the archive."""
+        pattern = re.compile(r"([a-z]+)_(\d{4}-\d{2}-\d{2})\.json\.gz")
+        index = {}
+        for path in sorted(self.puzzles_dir.glob("*/*.json.gz")):
+            match = pattern.fullmatch(path.name)
+            if match:
+                language, date = match.groups()
+                solution = read_puzzle(path)["solution"]
+                index.setdefault(language, {})[date] = solution
+        with self._lock:
+            self.index = index
+            self._save()
+
+    def solutions(self, language: str) -> set[str]:
+        """Return the set of the past solutions of a language."""
+        with self._lock:
+            return set(self.index.get(language, {}).values())
+
+    def add(self, language: str, date: str, solution: str):
+        """Record the solution of a new puzzle, and save the index."""
+        with self._lock:
+            self.index.setdefault(language, {})[date] = solution
+            self._save()
+
+    def _save(self):
+        atomic_write_json(self.path, self.index, indent=2, sort_keys=True)
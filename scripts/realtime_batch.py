@@ -0,0 +1,200 @@
+import asyncio
+import random
+import time
+import warnings
+from collections import deque
+from typing import Dict, Optional
+from google import genai
+from google.genai import errors
+from google.genai.types import HttpOptions
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class _RateLimiter:
+    """Sliding-window limiter on an amount (requests, tokens) per minute."""
+
+    def __init__(self, limit_per_minute: Optional[float]):
+        self.limit = limit_per_minute
+        self.window = deque()  # (timestamp, amount)
+        self.total = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1):
+        if self.limit is None:
+            return
+        amount = min(amount, self.limit)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.window and self.window[0][0] <= now - 60:
+                    self.total -= self.window.popleft()[1]
+                if self.total + amount <= self.limit:
+                    self.window.append((now, amount))
+                    self.total += amount
+                    return
+                await asyncio.sleep(self.window[0][0] + 60 - now)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    """Rough token count of a prompt (~4 characters per token)."""
+    return len(prompt) // 4 + 1
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    # Network errors (timeouts, dropped connections) are worth retrying
+    return isinstance(error, (OSError, asyncio.TimeoutError)) or (
+        type(error).__module__.split(".")[0] in ("httpx", "aiohttp")
+    )
+
+
+async def _run_all(
+    client: genai.Client,
+    prompts: Dict[str, str],
+    model: str,
+    config: genai.types.GenerateContentConfig,
+    max_concurrency: int,
+    requests_per_minute: Optional[float],
+    tokens_per_minute: Optional[float],
+    max_retries: int,
+    backoff_base: float,
+    progress_interval: float,
+) -> tuple[dict[str, str], dict]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    request_limiter = _RateLimiter(requests_per_minute)
+    token_limiter = _RateLimiter(tokens_per_minute)
+    results = {}
+    stats = {"completed": 0, "retries": 0, "failures": 0, "input_tokens": 0}
+    stats.update({"output_tokens": 0, "thoughts_tokens": 0})
+    start_time = time.monotonic()
+
+    async def run_one(prompt_id: str, prompt: str):
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                await request_limiter.acquire(1)
+                await token_limiter.acquire(_estimate_tokens(prompt))
+                try:
+                    resp = await client.aio.models.generate_content(
+                        model=model, contents=prompt, config=config
+                    )
+                    usage = resp.usage_metadata
+                    stats["input_tokens"] += usage.prompt_token_count or 0
+                    stats["output_tokens"] += usage.candidates_token_count or 0
+                    stats["thoughts_tokens"] += usage.thoughts_token_count or 0
+                    results[prompt_id] = resp.text or ""
+                    break
+                except Exception as error:
+                    if attempt == max_retries or not _is_retryable(error):
+                        warnings.warn(f"Error for prompt {prompt_id}: {error}")
+                        stats["failures"] += 1
+                        results[prompt_id] = ""
+                        break
+                    stats["retries"] += 1
+                    # Exponential backoff with full jitter
+                    await asyncio.sleep(random.uniform(0, backoff_base * 2**attempt))
+            stats["completed"] += 1
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(progress_interval)
+            _print_progress(stats, len(prompts), start_time)
+
+    reporter = asyncio.create_task(report_progress())
+    try:
+        await asyncio.gather(*[run_one(*item) for item in prompts.items()])
+    finally:
+        reporter.cancel()
+    stats["duration"] = time.monotonic() - start_time
+    _print_progress(stats, len(prompts), start_time)
+    return {prompt_id: results[prompt_id] for prompt_id in prompts}, stats
+
+
+def _print_progress(stats: dict, total: int, start_time: float):
+    print(
+        f"Realtime batch: {stats['completed']}/{total} done, "
+        f"{stats['retries']} retries, {stats['failures']} failures, "
+        f"{time.monotonic() - start_time:.1f}s elapsed"
+    )
+
+
+def realtime_batch(
+    prompts: Dict[str, str],
+    model: str = "gemini-2.5-flash",
+    temperature: float = 0.2,
+    gcs_bucket: Optional[str] = None,
+    project_id: Optional[str] = None,
+    location: str = "us-central1",
+    thinking_budget: int = 0,
+    max_concurrency: int = 32,
+    requests_per_minute: Optional[float] = 1000,
+    tokens_per_minute: Optional[float] = 1_000_000,
+    max_retries: int = 5,
+    backoff_base: float = 1.0,
+    progress_interval: float = 5.0,
+    client: Optional[genai.Client] = None,
+) -> tuple[dict[str, str], dict]:
+    """Runs a batch of prompts concurrently through the realtime Gemini API
+
+    Drop-in replacement for ``gemini_batch`` when a puzzle is needed quickly:
+    the prompts are sent as individual requests (at most ``max_concurrency``
+    at a time, within the per-minute limits) instead of a Vertex batch job.
+
+    Args:
+        prompts: A dictionary {prompt_id: prompt} of prompts to run
+        model: The model to use for the Gemini API
+        temperature: The temperature to use for the Gemini API
+        gcs_bucket: Unused, for compatibility with ``gemini_batch``
+        project_id: GCP project ID. If provided, Vertex AI is used
+        location: Google Cloud region for Vertex AI (default: us-central1)
+        thinking_budget: Budget for thinking in tokens (None: model default)
+        max_concurrency: Maximum number of requests in flight
+        requests_per_minute: Maximum number of requests per minute (None: no limit)
+        tokens_per_minute: Maximum number of (estimated) prompt tokens sent per minute
+        max_retries: Retries of a prompt after rate-limit, server or network errors
+        backoff_base: Base delay in seconds of the exponential backoff
+        progress_interval: Seconds between two progress reports
+        client: Gemini client to use (e.g. pointing at a local fake endpoint)
+
+    Returns:
+        A tuple (results, stats) where results is a dictionary {prompt_id: response}
+        and stats a dictionary of counters (retries, failures, tokens, duration)
+    """
+    if client is None:
+        if project_id:
+            client = genai.Client(
+                http_options=HttpOptions(api_version="v1"),
+                vertexai=True,
+                project=project_id,
+                location=location,
+            )
+        else:
+            client = genai.Client()
+
+    params = {"temperature": temperature}
+    if thinking_budget is not None:
+        params["thinking_config"] = genai.types.ThinkingConfig(
+            thinking_budget=thinking_budget
+        )
+    config = genai.types.GenerateContentConfig(
+        response_mime_type="text/plain", **params
+    )
+
+    print(f"Sending {len(prompts)} prompts to {model} (realtime API)")
+    results, stats = asyncio.run(
+        _run_all(
+            client,
+            prompts,
+            model=model,
+            config=config,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            progress_interval=progress_interval,
+        )
+    )
+    print(f"Successfully processed {len(results)} results")
+    return results, stats
@@ -0,0 +1,92 @@
+import time
+from typing import Callable, Dict, Optional
+
+from gemini_batch import gemini_batch
+from realtime_batch import realtime_batch
+
+
+def find_failed(results: Dict[str, str], prompt_ids) -> list[str]:
+    """Return the prompts whose result is missing or empty.
+
+    Failed requests, error statuses and unparsable output lines all end up
+    as missing or empty results.
+    """
+    return [
+        prompt_id for prompt_id in prompt_ids if not results.get(prompt_id, "").strip()
+    ]
+
+
+def repair_results(
+    results: Dict[str, str],
+    prompts: Dict[str, str],
+    model: str,
+    thinking_budget: Optional[int] = None,
+    max_realtime: int = 200,
+    max_rounds: int = 2,
+    realtime_function: Callable = realtime_batch,
+    batch_function: Callable = gemini_batch,
+    **batch_settings,
+) -> dict:
+    """Regenerate the failed results of a batch, and merge them in ``results``.
+
+    Only the prompts with a missing or empty result are run again: through
+    the realtime API when there are at most ``max_realtime`` of them, else
+    through a new batch job. This is repeated up to ``max_rounds`` times.
+
+    Args:
+        results: The {prompt_id: response} results of the batch (updated)
+        prompts: The {prompt_id: prompt} prompts of the batch
+        model: The model to use
+        thinking_budget: Budget for thinking in tokens
+        max_realtime: Maximum number of prompts repaired with realtime requests
+        max_rounds: Maximum number of repair attempts
+        realtime_function: Function running few prompts (``realtime_batch``)
+        batch_function: Function running many prompts (``gemini_batch``)
+        **batch_settings: Other parameters of the batch functions (temperature,
+          gcs_bucket, project_id, location)
+
+    Returns:
+        The repair statistics: failed, repaired and still failed prompt counts,
+        the backends used and the duration of the repair
+    """
+    start_time = time.time()
+    failed = find_failed(results, prompts)
+    stats = {"failed": len(failed), "repaired": 0, "backends": [], "duration": 0}
+    for _ in range(max_rounds):
+        if not failed:
+            break
+        if len(failed) <= max_realtime:
+            function, backend = realtime_function, "realtime"
+        else:
+            function, backend = batch_function, "batch"
+        print(f"Repairing {len(failed)} failed results ({backend})")
+        stats["backends"].append(backend)
+        try:
+            repaired, _job = function(
+                {prompt_id: prompts[prompt_id] for prompt_id in failed},
+                model=model,
+                thinking_budget=thinking_budget,
+                **batch_settings,
+            )
+        except Exception as error:
+            print(f"Repair failed: {error}")
+            break
+        for prompt_id, response in repaired.items():
+            if response.strip():
+                results[prompt_id] = response
+        failed = find_failed(results, failed)
+    stats["still_failed"] = len(failed)
+    stats["repaired"] = stats["failed"] - len(failed)
+    stats["duration"] = time.time() - start_time
+    return stats
+
+
+def format_repair_stats(stats: dict, name: str = "batch") -> str:
+    """Return a one-line summary of the repair of a batch."""
+    if not stats["failed"]:
+        return f"Repair ({name}): no failed results"
+    return (
+        f"Repair ({name}): {stats['repaired']}/{stats['failed']} failed results "
+        f"regenerated ({', '.join(stats['backends']) or 'not attempted'}), "
+        f"{stats['still_failed']} still empty, {stats['duration']:.1f}s"
+    )
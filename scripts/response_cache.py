@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class ResponseCache:
+    """A persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Responses are stored under a hash of everything that determines them
+    (provider, model, prompt, temperature, thinking budget, response schema).
+    Entries older than ``max_age`` seconds are dropped, and when the cache
+    holds more than ``max_entries`` the least recently used ones are evicted.
+
+    Args:
+        path: Path of the SQLite file (created if it doesn't exist)
+        max_entries: Maximum number of responses kept in the cache
+        max_age: Maximum age of a response in seconds (None for no limit)
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        max_entries: int = 50_000,
+        max_age: Optional[float] = 30 * 24 * 3600,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Return the content hash of the given request parameters."""
+        serialized = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for this key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """Store a response in the cache, evicting old entries if needed."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._connection.commit()
+            self._writes_since_eviction += 1
+            must_evict = self._writes_since_eviction >= 100
+        if must_evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones over the limit."""
+        with self._lock:
+            if self.max_age is not None:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.max_age,),
+                )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+            self._writes_since_eviction = 0
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.max_age is not None and created_at < now - self.max_age
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def summary(self) -> str:
+        """Return a one-line summary of the cache usage in this session."""
+        total = self.hits + self.misses
+        hit_rate = 100 * self.hits / total if total else 0
+        return (
+            f"Cache: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.0f}% hit rate), {len(self)} entries in {self.path}"
+        )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,32 @@
+from prefetch import rank_candidates
+from word_index import WordIndex
+
+
+def test_fallback_is_not_alphabetical():
+    playable = sorted(
+        f"{a}{b}{c}{d}" for a in "ABCD" for b in "EF" for c in "GH" for d in "IJ"
+    )
+    drawable = playable[::2]
+    ranked = rank_candidates(playable, drawable)
+    assert sorted(ranked) == playable
+    assert set(ranked[: len(drawable)]) == set(drawable)
+    assert ranked[: len(drawable)] != sorted(drawable)
+    assert ranked[len(drawable) :] != sorted(set(playable) - set(drawable))
+    assert rank_candidates(playable, drawable) == ranked
+
+
+def test_frequencies_come_first():
+    ranked = rank_candidates(["ABCD", "EFGH", "IJKL"], [], {"IJKL": 3, "EFGH": 1})
+    assert ranked[:2] == ["IJKL", "EFGH"]
+
+
+def test_shipped_frequencies_rank_common_words_first():
+    for language in ["en", "fr"]:
+        word_index = WordIndex(language)
+        for size in word_index.sizes:
+            words = word_index[size]
+            frequencies = word_index.frequencies(size)
+            assert frequencies, f"No frequencies for {language} words of size {size}"
+            ranked = rank_candidates(words.playable, words.drawable, frequencies)
+            assert ranked[:50] != sorted(ranked[:50])
+            assert set(ranked[:20]) <= set(frequencies)
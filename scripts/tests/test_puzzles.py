@@ -0,0 +1,35 @@
+from puzzles import LazyPrompts, pack_prompts, unpack_results
+
+
+def test_packed_prompts_are_rendered_when_read():
+    rendered = []
+
+    def render(guess):
+        rendered.append(guess)
+        return f"Clue for {guess}"
+
+    prompts = pack_prompts(
+        {
+            "en_2025-08-01": LazyPrompts(["CRANE", "SLATE"], render),
+            "fr_2025-08-01": {"ARBRE": "Indice pour ARBRE"},
+        }
+    )
+    assert list(prompts) == [
+        "en_2025-08-01/CRANE",
+        "en_2025-08-01/SLATE",
+        "fr_2025-08-01/ARBRE",
+    ]
+    assert len(prompts) == 3 and "en_2025-08-01/SLATE" in prompts
+    assert "en_2025-08-01/OTHER" not in prompts
+    assert rendered == []
+    assert prompts["en_2025-08-01/SLATE"] == "Clue for SLATE"
+    assert rendered == ["SLATE"]
+    assert dict(prompts)["fr_2025-08-01/ARBRE"] == "Indice pour ARBRE"
+
+
+def test_unpack_results_splits_packed_ids():
+    results = {"en_2025-08-01/CRANE": "a", "fr_2025-08-01/ARBRE": "b"}
+    assert unpack_results(results) == {
+        "en_2025-08-01": {"CRANE": "a"},
+        "fr_2025-08-01": {"ARBRE": "b"},
+    }
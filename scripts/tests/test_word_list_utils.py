@@ -0,0 +1,127 @@
+import http.server
+import re
+import threading
+
+import pytest
+
+from word_lists.utils import cached_stage, download
+
+
+def test_cached_stage_is_rebuilt_with_the_stages_it_uses(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("a b")
+    builds = []
+    results = {}
+
+    def words():
+        builds.append("words")
+        return source.read_text().split()
+
+    def word_count():
+        builds.append("count")
+        return len(results["words"])
+
+    def run_stages():
+        results["words"] = cached_stage("words", [source], words, tmp_path)
+        return cached_stage("count", [], word_count, tmp_path, stages=["words"])
+
+    assert run_stages() == 2
+    assert run_stages() == 2
+    assert builds == ["words", "count"]
+    source.write_text("a b c")
+    assert run_stages() == 3
+    assert builds == ["words", "count", "words", "count"]
+
+
+class FileServer:
+    """Local HTTP server of one file, honoring Range and If-Range like most
+    servers (the requests it receives are recorded in ``requests``)."""
+
+    def __init__(self, content, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                content, first_byte = server.content, 0
+                range_header = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if range_header and if_range in (None, server.etag):
+                    first_byte = int(re.match(r"bytes=(\d+)-", range_header)[1])
+                    if first_byte >= len(content):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(content)}")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {first_byte}-{len(content) - 1}/{len(content)}",
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(content) - first_byte))
+                self.end_headers()
+                self.wfile.write(content[first_byte:])
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/file.txt"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer(b"0123456789" * 1000)
+    yield server
+    server.close()
+
+
+def interrupted_download(tmp_path, content, validator='"v1"'):
+    """Return the path of a download interrupted after 3000 bytes."""
+    path = tmp_path / "file.txt"
+    (tmp_path / "file.txt.part").write_bytes(content[:3000])
+    (tmp_path / "file.txt.part.validator").write_text(validator)
+    return path
+
+
+def test_download_resumes_an_unchanged_file(tmp_path, file_server):
+    path = interrupted_download(tmp_path, file_server.content)
+    download(file_server.url, path)
+    assert path.read_bytes() == file_server.content
+    assert file_server.requests[-1]["Range"] == "bytes=3000-"
+    assert not (tmp_path / "file.txt.part.validator").exists()
+
+
+def test_download_restarts_a_file_changed_on_the_server(tmp_path, file_server):
+    path = interrupted_download(tmp_path, file_server.content)
+    file_server.content = b"abcdefghij" * 1000
+    file_server.etag = '"v2"'
+    download(file_server.url, path)
+    assert path.read_bytes() == file_server.content
+
+
+def test_download_restarts_a_part_longer_than_the_file(tmp_path, file_server):
+    path = interrupted_download(tmp_path, file_server.content)
+    file_server.content = file_server.content[:2000]
+    download(file_server.url, path)
+    assert path.read_bytes() == file_server.content
+    assert "Range" not in file_server.requests[-1]
+
+
+def test_download_restarts_without_validator(tmp_path, file_server):
+    path = interrupted_download(tmp_path, b"x" * 3000)
+    (tmp_path / "file.txt.part.validator").unlink()
+    download(file_server.url, path)
+    assert path.read_bytes() == file_server.content
+    assert len(file_server.requests) == 1 and "Range" not in file_server.requests[0]
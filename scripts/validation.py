@@ -0,0 +1,134 @@
+import json
+import re
+import time
+from pathlib import Path
+from typing import Iterable
+
+from accents import normalize_word, remove_accents
+
+VALIDATION_REPORTS_DIR = Path(__file__).parent / ".cache" / "validation_reports"
+
+# A second sentence: an end mark followed by a space and a capital letter (the
+# periods of abbreviations such as "Dr. Seuss" or "M. Hulot" don't count)
+SENTENCE_BREAK_PATTERN = re.compile(
+    r"(?<!\bDr)(?<!\bMr)(?<!\bMrs)(?<!\bMs)(?<!\bSt)(?<!\bM)"
+    r"[.!?…](?=\s+[\"«“(]?[A-ZÀ-Ý0-9])"
+)
+
+
+class ClueValidator:
+    """Checks the clues of a puzzle with patterns compiled once per puzzle.
+
+    A clue is flagged if it is empty, doesn't refer to the secret word with
+    the placeholder (e.g. "THE WORD"), has more than one sentence, or contains
+    the secret word or one of its avoid terms (ignoring case, accents and
+    plural endings). A term equal to the guess of the clue is allowed.
+
+    Args:
+        secret_word: The solution of the puzzle
+        avoid: The terms the clues must not use
+        placeholder: Regular expression of the placeholder of the secret word
+    """
+
+    def __init__(self, secret_word: str, avoid: Iterable[str], placeholder: str):
+        self.secret_word = normalize_word(secret_word)
+        terms = {normalize_word(term) for term in [secret_word, *avoid]} - {""}
+        alternatives = "|".join(
+            re.escape(term) for term in sorted(terms, key=len, reverse=True)
+        )
+        self.terms_pattern = re.compile(rf"\b(?P<term>{alternatives})(?:S|ES|X)?\b")
+        self.placeholder_pattern = re.compile(placeholder)
+
+    def check(self, guess: str, clue: str) -> list[str]:
+        """Return the problems of the clue of this guess (empty if none)."""
+        if not clue.strip():
+            return ["empty"]
+        problems = []
+        if not self.placeholder_pattern.search(clue):
+            problems.append("placeholder")
+        if SENTENCE_BREAK_PATTERN.search(clue.strip()):
+            problems.append("sentences")
+        text = remove_accents(self.placeholder_pattern.sub(" ", clue).upper())
+        guess = normalize_word(guess)
+        for match in self.terms_pattern.finditer(text):
+            term = match.group("term")
+            if term == guess:
+                continue
+            problem = "secret" if term == self.secret_word else f"avoid:{term}"
+            if problem not in problems:
+                problems.append(problem)
+        return problems
+
+
+def validate_clues(
+    results: dict[str, str], secret_word: str, avoid: Iterable[str], placeholder: str
+) -> dict:
+    """Check all the clues of a puzzle.
+
+    Args:
+        results: The {guess: clue} clues of the puzzle ("solution" is ignored)
+        secret_word: The solution of the puzzle
+        avoid: The terms the clues must not use
+        placeholder: Regular expression of the placeholder of the secret word
+
+    Returns:
+        The validation report: number of clues checked, {guess: problems} of
+        the flagged clues, number of clues per problem type, and duration
+    """
+    start_time = time.perf_counter()
+    validator = ClueValidator(secret_word, avoid, placeholder)
+    flagged = {}
+    checked = 0
+    for guess, clue in results.items():
+        if guess == "solution":
+            continue
+        checked += 1
+        problems = validator.check(guess, clue)
+        if problems:
+            flagged[guess] = problems
+    counts = {}
+    for problems in flagged.values():
+        for problem in problems:
+            kind = problem.split(":")[0]
+            counts[kind] = counts.get(kind, 0) + 1
+    return {
+        "solution": secret_word,
+        "checked": checked,
+        "flagged": flagged,
+        "counts": counts,
+        "duration": time.perf_counter() - start_time,
+    }
+
+
+def format_validation(report: dict, name: str = "puzzle") -> str:
+    """Return a one-line summary of a validation report."""
+    counts = ", ".join(f"{n} {kind}" for kind, n in sorted(report["counts"].items()))
+    summary = (
+        f"Validation ({name}): {len(report['flagged'])}/{report['checked']} "
+        f"clues flagged"
+    )
+    if report.get("regenerated"):
+        summary += f" after regenerating {report['regenerated']}"
+    return summary + (f" ({counts})" if counts else "")
+
+
+def validation_report_path(
+    puzzle_file: Path | str, reports_dir: Path = VALIDATION_REPORTS_DIR
+) -> Path:
+    """Return the path of the validation report of a puzzle file, e.g.
+    .cache/validation_reports/en_2025-06-01.validation.json for
+    en_2025-06-01.json.gz. The reports stay out of the published puzzles."""
+    name = Path(puzzle_file).name
+    for suffix in [".gz", ".json", ".vbp"]:
+        name = name.removesuffix(suffix)
+    return Path(reports_dir) / f"{name}.validation.json"
+
+
+def write_validation_report(
+    report: dict, puzzle_file: Path | str, reports_dir: Path = VALIDATION_REPORTS_DIR
+) -> Path:
+    """Write the validation report of a puzzle file in ``reports_dir``."""
+    path = validation_report_path(puzzle_file, reports_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return path
@@ -0,0 +1,148 @@
+import json
+import struct
+import warnings
+import zlib
+from pathlib import Path
+from typing import NamedTuple
+
+WORD_LISTS_DIR = Path(__file__).parent / "word_lists"
+MAGIC = b"VWI1"
+
+
+class Words(NamedTuple):
+    """The words of one size: lists in their original order, and sets for
+    fast membership tests."""
+
+    playable: list[str]
+    drawable: list[str]
+    playable_set: frozenset[str]
+    drawable_set: frozenset[str]
+
+
+def words_json_path(language: str, words_dir: Path = WORD_LISTS_DIR) -> Path:
+    return Path(words_dir) / language / f"{language}_words.json"
+
+
+def frequencies_json_path(language: str, words_dir: Path = WORD_LISTS_DIR) -> Path:
+    return Path(words_dir) / language / f"{language}_frequencies.json"
+
+
+def _checksum(path: Path) -> int:
+    return zlib.crc32(path.read_bytes())
+
+
+def write_word_index(json_path: Path | str, index_path: Path | str = None):
+    """Compile a <lang>_words.json file into its binary sidecar (.bin).
+
+    The sidecar has a small JSON header (CRC32 of the source file, offset and
+    length of each section) followed by one section per word size (playable
+    and drawable words, newline-separated) and one for the accented forms,
+    so a reader only decodes the sizes it needs.
+    """
+    json_path = Path(json_path)
+    index_path = Path(index_path or json_path.with_suffix(".bin"))
+    data = json.loads(json_path.read_text())
+    sections = {}
+    for key, value in data.items():
+        if key == "accented_dict":
+            text = "\n".join(f"{word}\t{accented}" for word, accented in value.items())
+        else:
+            text = "\n".join(value["playable"]) + "\0" + "\n".join(value["drawable"])
+        sections[key] = text.encode("utf-8")
+
+    offsets = {}
+    position = 0
+    for key, section in sections.items():
+        offsets[key] = [position, len(section)]
+        position += len(section)
+    header = json.dumps({"source_crc32": _checksum(json_path), "sections": offsets})
+    header = header.encode("utf-8")
+    with open(index_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for section in sections.values():
+            f.write(section)
+
+
+class WordIndex:
+    """The word lists of a language, loaded lazily one size at a time.
+
+    Reads the binary sidecar written by ``write_word_index`` (by the
+    en_words.py and fr_words.py builders). If the sidecar is missing or
+    doesn't match the JSON word list, the JSON file is parsed instead.
+
+    Args:
+        language: "en" or "fr"
+        words_dir: Directory of the word lists (one folder per language)
+    """
+
+    def __init__(self, language: str, words_dir: Path = WORD_LISTS_DIR):
+        self.json_path = words_json_path(language, words_dir)
+        self.index_path = self.json_path.with_suffix(".bin")
+        self.frequencies_path = frequencies_json_path(language, words_dir)
+        self._words = {}
+        self._frequencies = None
+        self._accented = None
+        self._data = None  # Parsed JSON, when there is no valid sidecar
+        self._sections = None
+        self._load_header()
+
+    def _load_header(self):
+        if self.index_path.exists():
+            with open(self.index_path, "rb") as f:
+                if f.read(4) == MAGIC:
+                    (header_length,) = struct.unpack("<I", f.read(4))
+                    header = json.loads(f.read(header_length))
+                    if header["source_crc32"] == _checksum(self.json_path):
+                        self._sections = header["sections"]
+                        self._start = 8 + header_length
+                        return
+            warnings.warn(f"{self.index_path} is outdated, reading the JSON list")
+        self._data = json.loads(self.json_path.read_text())
+
+    def _read_section(self, key: str) -> str:
+        offset, length = self._sections[key]
+        with open(self.index_path, "rb") as f:
+            f.seek(self._start + offset)
+            return f.read(length).decode("utf-8")
+
+    @property
+    def sizes(self) -> list[int]:
+        keys = self._sections if self._data is None else self._data
+        return sorted(int(key) for key in keys if key.isdigit())
+
+    def __getitem__(self, size: int | str) -> Words:
+        """Return the words of this size (loaded on first access)."""
+        size = str(size)
+        if size not in self._words:
+            if self._data is not None:
+                playable = self._data[size]["playable"]
+                drawable = self._data[size]["drawable"]
+            else:
+                playable_text, drawable_text = self._read_section(size).split("\0")
+                playable = playable_text.split("\n") if playable_text else []
+                drawable = drawable_text.split("\n") if drawable_text else []
+            self._words[size] = Words(
+                playable, drawable, frozenset(playable), frozenset(drawable)
+            )
+        return self._words[size]
+
+    @property
+    def accented(self) -> dict[str, str]:
+        """The accented forms of the unaccented words (French only)."""
+        if self._accented is None:
+            if self._data is not None:
+                self._accented = self._data.get("accented_dict", {})
+            elif "accented_dict" in self._sections:
+                lines = self._read_section("accented_dict").split("\n")
+                self._accented = dict(line.split("\t") for line in lines if line)
+            else:
+                self._accented = {}
+        return self._accented
+
+    def frequencies(self, size: int | str) -> dict[str, float]:
+        """The corpus frequencies of the playable words of this size, written
+        by the builders next to the word list (empty if there is no file)."""
+        if self._frequencies is None:
+            path = self.frequencies_path
+            self._frequencies = json.loads(path.read_text()) if path.exists() else {}
+        return self._frequencies.get(str(size), {})
@@ -0,0 +1,60 @@
+"""Write <lang>_frequencies.json from the clues of the published puzzles.
+
+The builders (en_words.py, fr_words.py) write corpus frequencies of the
+playable words, used to rank the clues to prefetch. This script writes the
+same file from how often each playable word appears in the published clues,
+for trees where the source data of the builders isn't at hand:
+
+    python -m word_lists.clue_frequencies --language en
+"""
+
+import json
+import re
+from collections import Counter
+
+import click
+
+from accents import remove_accents
+from puzzles import PUZZLES_DIR, read_puzzle
+from word_index import WordIndex, frequencies_json_path
+
+WORD_PATTERN = re.compile(r"[A-Z]+")
+
+
+def clue_frequencies(language, puzzle_paths):
+    """Return {size: {word: count}} of the playable words in the clues (the
+    guess of a clue isn't counted), most frequent first."""
+    word_index = WordIndex(language)
+    playable = set()
+    for size in word_index.sizes:
+        playable.update(word_index[size].playable)
+    counts = Counter()
+    for path in puzzle_paths:
+        for guess, clue in read_puzzle(path).items():
+            if guess == "solution":
+                continue
+            words = WORD_PATTERN.findall(remove_accents(clue.upper()))
+            counts.update(w for w in words if w != guess and w in playable)
+    return {
+        size: {
+            word: count
+            for word, count in counts.most_common()
+            if len(word) == size and word in word_index[size].playable_set
+        }
+        for size in word_index.sizes
+    }
+
+
+@click.command()
+@click.option("--language", default="en", type=click.Choice(["en", "fr"]))
+def main(language):
+    paths = sorted((PUZZLES_DIR / language).glob(f"{language}_*.json.gz"))
+    frequencies = clue_frequencies(language, paths)
+    output_file = frequencies_json_path(language)
+    output_file.write_text(json.dumps(frequencies, indent=1))
+    counted = sum(len(words) for words in frequencies.values())
+    print(f"{counted} words counted in {len(paths)} puzzles, see {output_file}")
+
+
+if __name__ == "__main__":
+    main()
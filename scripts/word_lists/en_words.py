@@ -1,77 +1,104 @@
-from utils import download
-import pandas
+# Run from the scripts folder with: python -m word_lists.en_words
+from word_lists.utils import download_all, cached_stage
+from word_index import write_word_index
 import json
 from pathlib import Path
 import yaml
 
 # DOWNLOAD DATA
+# {filename: (url, sha256)}. Set the sha256 of a source to pin its content
+# (None: not checked). Set WORD_LISTS_MIRROR to a folder with copies of these
+# files to build offline.
+
+SOURCES = {
+    "count_1w.txt": ("https://norvig.com/ngrams/count_1w.txt", None),
+    "mobypos.txt": ("https://www.gutenberg.org/files/3203/files/mobypos.txt", None),
+    "2of12id.json": (
+        "https://raw.githubusercontent.com/felixfischer/categorized-words/refs/heads/master/2of12id.json",
+        None,
+    ),
+    "en_thesaurus.jsonl": (
+        "https://raw.githubusercontent.com/zaibacu/thesaurus/refs/heads/master/en_thesaurus.jsonl",
+        None,
+    ),
+}
 
 dir = Path(__file__).parent
-lexicon_path = dir / "data" / "count_1w.txt"
-download(
-    url="https://norvig.com/ngrams/count_1w.txt",
-    filename=lexicon_path,
-    replace=False,
-)
-moby_categories_path = dir / "data" / "mobypos.txt"
-download(
-    url="https://www.gutenberg.org/files/3203/files/mobypos.txt",
-    filename=moby_categories_path,
-    replace=False,
-)
-
-word_categories_path = dir / "data" / "2of12id.json"
-download(
-    url="https://raw.githubusercontent.com/felixfischer/categorized-words/refs/heads/master/2of12id.json",
-    filename=word_categories_path,
-    replace=False,
-)
-wordnet_thesaurus_path = dir / "data" / "en_thesaurus.jsonl"
-download(
-    url="https://raw.githubusercontent.com/zaibacu/thesaurus/refs/heads/master/en_thesaurus.jsonl",
-    filename=wordnet_thesaurus_path,
-    replace=False,
-)
+paths = download_all(SOURCES, dir / "data")
+lexicon_path = paths["count_1w.txt"]
+moby_categories_path = paths["mobypos.txt"]
+word_categories_path = paths["2of12id.json"]
+wordnet_thesaurus_path = paths["en_thesaurus.jsonl"]
 
 
 # CREATE THE SINGULAR NOUNS LIST
+# Each stage is cached in data/cache and only rebuilt when its inputs change,
+# so editing keep_and_avoid.yaml doesn't parse the data files again.
+
+
+def moby_nouns():
+    nouns_list = set()
+    with open(moby_categories_path, encoding="mac_roman") as f:
+        for line in f:
+            word, categories = line.rstrip("\r\n").split("\\")
+            if "N" in categories and (word.lower() == word):
+                nouns_list.add(word.lower())
+    return nouns_list
+
+
+def thesaurus_nouns():
+    """Nouns of the WordNet thesaurus (removes some stray plurals)."""
+    nouns_list = set()
+    with open(wordnet_thesaurus_path) as f:
+        for line in f:
+            if '"noun"' not in line:  # Only decode the lines that may match
+                continue
+            entry = json.loads(line)
+            if entry["pos"] == "noun":
+                nouns_list.add(entry["word"])
+    return nouns_list
+
+
+moby_noun_set = cached_stage("en_moby_nouns", [moby_categories_path], moby_nouns)
+thesaurus_noun_set = cached_stage(
+    "en_thesaurus_nouns", [wordnet_thesaurus_path], thesaurus_nouns
+)
 
-nouns_list = set()
-for line in moby_categories_path.read_text(encoding="mac_roman").splitlines():
-    word, categories = line.split("\\")
-    if "N" in categories and (word.lower() == word):
-        nouns_list.add(word.lower())
-
-
-# INTERSECT WITH WORDNET THESAURUS (removes some stray plurals)
 
-thesaurus_nouns = set()
-for line in wordnet_thesaurus_path.read_text().splitlines():
-    entry = json.loads(line)
-    if entry["pos"] == "noun":
-        thesaurus_nouns.add(entry["word"])
-nouns_list = nouns_list.intersection(thesaurus_nouns)
+def noun_frequencies():
+    """Frequencies of the nouns found in Moby, the thesaurus and 2of12id."""
+    import pandas
 
-# INTERSECT MOBY WITH 2OF12ID
-word_categories = json.loads(word_categories_path.read_text())
-nouns_list = nouns_list.intersection(set(word_categories["N"]))
+    nouns_list = moby_noun_set.intersection(thesaurus_noun_set)
+    word_categories = json.loads(word_categories_path.read_text())
+    nouns_list = nouns_list.intersection(set(word_categories["N"]))
 
+    lexicon = pandas.read_csv(
+        lexicon_path,
+        sep="\t",
+        header=None,
+        names=["word", "frequency"],
+        dtype={"word": "string", "frequency": "int64"},
+    ).dropna(subset=["word"])
+    nouns = lexicon[lexicon.word.isin(nouns_list)]
+    return dict(zip(nouns.word.tolist(), nouns.frequency.tolist()))
 
-# INTERSECT WITH POPULAR FIVERS LIST
 
-lexicon = pandas.read_csv(
-    lexicon_path, sep="\t", header=None, names=["word", "frequency"]
-).dropna(subset=["word"])
-nouns = lexicon[lexicon.word.isin(nouns_list)]
+nouns = cached_stage(
+    "en_noun_frequencies",
+    [word_categories_path, lexicon_path],
+    noun_frequencies,
+    stages=["en_moby_nouns", "en_thesaurus_nouns"],
+)
 
 with open(dir / "en" / "keep_and_avoid.yaml", "r") as f:
     keep_and_avoid = yaml.load(f, Loader=yaml.FullLoader)
 
 
 def get_words(size):
-    subset = nouns[(nouns.word.str.len() == size) & (~nouns.word.str.contains("-"))]
-    playable = subset.word.str.upper().to_list()
-    drawable = subset[subset.frequency > 5_000_000].word.str.upper().to_list()
+    subset = {w: f for w, f in nouns.items() if len(w) == size and "-" not in w}
+    playable = [word.upper() for word in subset]
+    drawable = [word.upper() for word, freq in subset.items() if freq > 5_000_000]
     keep_playable = [w for w in keep_and_avoid["keep_playable"] if len(w) == size]
     keep_drawable = [w for w in keep_and_avoid["keep_drawable"] if len(w) == size]
     filtered_drawable = [
@@ -83,6 +110,17 @@ def get_words(size):
     return {"playable": playable, "drawable": drawable}
 
 
+def get_frequencies(size):
+    """Count of the playable words in count_1w.txt, most frequent first (used
+    to rank the clues to prefetch)."""
+    playable = set(data[size]["playable"])
+    subset = [(w.upper(), f) for w, f in nouns.items() if w.upper() in playable]
+    return dict(sorted(subset, key=lambda item: -item[1]))
+
+
 data = {n: get_words(n) for n in [4, 5, 6]}
 with open(dir / "en" / "en_words.json", "w") as f:
     json.dump(data, f, indent=2)
+write_word_index(dir / "en" / "en_words.json")
+with open(dir / "en" / "en_frequencies.json", "w") as f:
+    json.dump({n: get_frequencies(n) for n in data}, f, indent=1)
@@ -1,55 +1,74 @@
-from utils import download
+# Run from the scripts folder with: python -m word_lists.fr_words
+from word_lists.utils import download_all, cached_stage
+from word_index import write_word_index
 from pathlib import Path
-import pandas
+import accents
 import json
-import re
 
 
-def replace_accents(word):
-    """Replace all accented characters with their unaccented version"""
-    replacements = {
-        r"[àâä]": "a",
-        r"[éèêë]": "e",
-        r"[îï]": "i",
-        r"[ôö]": "o",
-        r"[ûü]": "u",
-        r"[ç]": "c",
-        r"[œ]": "oe",
-        r"[æ]": "ae",
-    }
+# {filename: (url, sha256)}, see en_words.py
+SOURCES = {
+    "Lexique383.tsv": (
+        "http://www.lexique.org/databases/Lexique383/Lexique383.tsv",
+        None,
+    ),
+}
 
-    for pattern, replacement in replacements.items():
-        word = re.sub(pattern, replacement, word)
-    return word
+dir = Path(__file__).parent
+lexicon_path = download_all(SOURCES, dir / "data")["Lexique383.tsv"]
 
 
-dir = Path(__file__).parent
-lexicon_path = dir / "data" / "Lexique383.tsv"
-download(
-    url="http://www.lexique.org/databases/Lexique383/Lexique383.tsv",
-    filename=lexicon_path,
-    replace=False,
-)
-lexicon = pandas.read_csv(lexicon_path, sep="\t").dropna(subset=["ortho"])
-nouns = lexicon[
-    (lexicon.cgram == "NOM")
-    & (lexicon.nombre != "p")
-    & (lexicon.deflem > 40)
-    & (lexicon.freqfilms2 > 0)
-    & (lexicon.freqlivres > 0)
-]
-print("found", len(nouns), "singular nouns")
+def lexicon_nouns_and_adjectives():
+    """Singular nouns (with the columns used below) and unaccented adjectives
+    of Lexique.
+
+    The result is cached in data/cache and only rebuilt when Lexique383.tsv
+    (or the accents module) changes. Only the needed columns are read, with
+    explicit types.
+    """
+    import pandas
 
-adjectives = set(
-    [replace_accents(word).upper() for word in lexicon[(lexicon.cgram == "ADJ")].ortho]
+    lexicon = pandas.read_csv(
+        lexicon_path,
+        sep="\t",
+        usecols=["ortho", "cgram", "nombre", "freqfilms2", "freqlivres", "deflem"],
+        dtype={
+            "ortho": "string",
+            "cgram": "category",
+            "nombre": "category",
+            "freqfilms2": "float64",
+            "freqlivres": "float64",
+            "deflem": "float64",
+        },
+    ).dropna(subset=["ortho"])
+    nouns = lexicon[
+        (lexicon.cgram == "NOM")
+        & (lexicon.nombre != "p")
+        & (lexicon.deflem > 40)
+        & (lexicon.freqfilms2 > 0)
+        & (lexicon.freqlivres > 0)
+    ]
+    adjectives = lexicon[lexicon.cgram == "ADJ"].ortho
+    adjectives = set(adjectives.str.translate(accents.ACCENT_TABLE).str.upper())
+    # Plain (ortho, unaccented, deflem, freqfilms2) tuples: reading the cache
+    # needs no pandas
+    unaccented = nouns.ortho.str.translate(accents.ACCENT_TABLE)
+    columns = [nouns.ortho, unaccented, nouns.deflem, nouns.freqfilms2]
+    nouns = list(zip(*[column.tolist() for column in columns]))
+    return nouns, adjectives
+
+
+nouns, adjectives = cached_stage(
+    "fr_lexicon", [lexicon_path, accents.__file__], lexicon_nouns_and_adjectives
 )
+print("found", len(nouns), "singular nouns")
 print("found", len(adjectives), "adjectives")
 
 unaccented_words = set(
-    [word.upper() for word in nouns.ortho if replace_accents(word) == word]
+    [word.upper() for word, unaccented, _, _ in nouns if unaccented == word]
 )
 
-unaccented_dict = {word.upper(): replace_accents(word).upper() for word in nouns.ortho}
+unaccented_dict = {word.upper(): unaccented.upper() for word, unaccented, _, _ in nouns}
 accented_dict = {
     unaccented: word
     for word, unaccented in unaccented_dict.items()
@@ -58,24 +77,40 @@ accented_dict = {
 
 
 def get_words(size):
-    sized_nouns = nouns[
-        (nouns.ortho.str.len() == size) & (~nouns.ortho.str.contains("-"))
+    sized_nouns = [
+        noun for noun in nouns if len(noun[0]) == size and "-" not in noun[0]
     ]
-    known_nouns = sized_nouns[(sized_nouns.deflem > 80) & (sized_nouns.freqfilms2 > 5)]
-    playable = [unaccented_dict[word.upper()] for word in sized_nouns.ortho]
+    known_nouns = [
+        word
+        for word, _, deflem, freqfilms2 in sized_nouns
+        if deflem > 80 and freqfilms2 > 5
+    ]
+    playable = [unaccented_dict[word.upper()] for word, _, _, _ in sized_nouns]
     drawable = [
-        unaccented_dict[word.upper()]
-        for word in known_nouns.ortho
-        if word not in adjectives
+        unaccented_dict[word.upper()] for word in known_nouns if word not in adjectives
     ]
     print(f"{len(playable)} playable, {len(drawable)} drawable of size {size}")
     return {"drawable": drawable, "playable": playable}
 
 
+def get_frequencies(size):
+    """Film-subtitle frequency of the playable words (the highest of their
+    accented forms), most frequent first (used to rank the clues to prefetch)."""
+    frequencies = {}
+    for word, _, _, freqfilms2 in nouns:
+        if len(word) == size and "-" not in word:
+            unaccented = unaccented_dict[word.upper()]
+            frequencies[unaccented] = max(frequencies.get(unaccented, 0), freqfilms2)
+    return dict(sorted(frequencies.items(), key=lambda item: -item[1]))
+
+
 data = {n: get_words(n) for n in [4, 5, 6]}
 all_words = set(word for subdata in data.values() for word in subdata["drawable"])
 data["accented_dict"] = {k: v for k, v in accented_dict.items() if k in all_words}
 with open(dir / "fr" / "fr_words.json", "w") as f:
     json.dump(data, f, indent=2)
+write_word_index(dir / "fr" / "fr_words.json")
+with open(dir / "fr" / "fr_frequencies.json", "w") as f:
+    json.dump({n: get_frequencies(n) for n in [4, 5, 6]}, f, indent=1)
 with open(dir.parent / "verbiage" / "public" / "fr_accented_dict.json", "w") as f:
     json.dump(accented_dict, f, indent=2)
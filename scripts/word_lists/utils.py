@@ -1,13 +1,231 @@
-import requests
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+DATA_DIR = Path(__file__).parent / "data"
+CACHE_DIR = DATA_DIR / "cache"
+_file_hashes_lock = threading.Lock()
+_stage_keys = {}  # {stage name: key} of the stages run in this process
 
-def download(url, filename, replace=False):
-    """Download the file (check if it already exists)"""
-    if Path(filename).exists() and not replace:
-        print(f"File {filename} already exists")
-        return
-    print(f"Downloading {url} to {filename}")
-    response = requests.get(url)
-    with open(filename, "wb") as f:
-        f.write(response.content)
+
+def download(
+    url,
+    filename,
+    replace=False,
+    sha256=None,
+    mirror_dir=None,
+    timeout=60,
+    chunk_size=1 << 20,
+):
+    """Download a file, streaming it to a temporary file renamed at the end.
+
+    An interrupted download leaves a ``.part`` file, and the next attempt
+    resumes it with an HTTP range request, if the file on the server is still
+    the same (same ETag or Last-Modified date), else starts over. When a
+    ``sha256`` is pinned, the downloaded (or existing) file must match it, else
+    its SHA-256 is printed so it can be pinned.
+
+    Args:
+        url: URL of the file
+        filename: Where to write the file
+        replace: Download the file again even if it already exists
+        sha256: Expected SHA-256 of the file, or None to skip the check
+        mirror_dir: Directory with local copies of the sources (same file
+          names), used instead of the network when it has the file. Defaults to
+          the WORD_LISTS_MIRROR environment variable
+        timeout: Timeout in seconds of the connection and of each read
+        chunk_size: Size of the chunks written to disk
+    """
+    filename = Path(filename)
+    if filename.exists() and not replace:
+        if sha256 is None or file_hash(filename) == sha256:
+            print(f"File {filename} already exists")
+            return filename
+        print(f"File {filename} doesn't match its checksum, downloading it again")
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    part_path = filename.with_name(filename.name + ".part")
+    mirror_dir = mirror_dir or os.environ.get("WORD_LISTS_MIRROR")
+    mirror_path = Path(mirror_dir) / filename.name if mirror_dir else None
+    if mirror_path is not None and mirror_path.exists():
+        print(f"Copying {mirror_path} to {filename}")
+        shutil.copyfile(mirror_path, part_path)
+    else:
+        _download_to_part(url, part_path, timeout, chunk_size)
+
+    digest = _sha256(part_path)
+    if sha256 is None:
+        print(f"SHA-256 of {filename.name}: {digest} (not pinned in SOURCES)")
+    elif digest != sha256:
+        part_path.unlink()
+        _validator_path(part_path).unlink(missing_ok=True)
+        raise ValueError(f"Checksum mismatch for {url}: {digest} != {sha256}")
+    os.replace(part_path, filename)
+    _validator_path(part_path).unlink(missing_ok=True)
+    return filename
+
+
+def _validator_path(part_path):
+    """Return the file holding the ETag or Last-Modified date of a .part file."""
+    return part_path.with_name(part_path.name + ".validator")
+
+
+def _content_range(response):
+    """Return the (first byte, total size) of a Content-Range header, with None
+    for the unknown values (e.g. "bytes */1234" in a 416 response)."""
+    match = re.fullmatch(
+        r"bytes (\d+|\*)(?:-\d+)?/(\d+|\*)",
+        response.headers.get("Content-Range", "").strip(),
+    )
+    if match is None:
+        return None, None
+    return tuple(None if value == "*" else int(value) for value in match.groups())
+
+
+def _download_to_part(url, part_path, timeout, chunk_size):
+    import requests
+
+    validator_path = _validator_path(part_path)
+    start = part_path.stat().st_size if part_path.exists() else 0
+    validator = validator_path.read_text() if validator_path.exists() else None
+    headers = {}
+    if start and validator:
+        # The server sends the whole file (200) if it changed since the .part
+        headers = {"Range": f"bytes={start}-", "If-Range": validator}
+    else:
+        start = 0
+    print(f"Downloading {url}" + (f" (resuming at {start} bytes)" if start else ""))
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        first_byte, total_size = _content_range(response)
+        if response.status_code == 416 or (
+            response.status_code == 206 and first_byte != start
+        ):
+            if response.status_code == 416 and total_size == start:
+                return  # The .part file is already complete
+            print(f"Can't resume {url}, downloading it from the start")
+            part_path.unlink(missing_ok=True)
+            validator_path.unlink(missing_ok=True)
+            return _download_to_part(url, part_path, timeout, chunk_size)
+        response.raise_for_status()
+        if response.status_code == 206:
+            mode = "ab"
+        else:  # The whole file: range ignored, or file changed on the server
+            mode = "wb"
+            etag = response.headers.get("ETag", "")
+            validator = None if etag.startswith("W/") else etag
+            validator = validator or response.headers.get("Last-Modified")
+            if validator:
+                validator_path.write_text(validator)
+            else:  # Can't tell whether the file changes, never resume it
+                validator_path.unlink(missing_ok=True)
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
+
+def download_all(sources, data_dir=DATA_DIR, max_workers=4, **kwargs):
+    """Download the sources of a word list concurrently.
+
+    Args:
+        sources: {filename: (url, sha256)} of the files to download in
+          ``data_dir`` (sha256 can be None)
+        data_dir: Directory of the downloaded files
+        max_workers: Maximum number of simultaneous downloads
+        **kwargs: Other parameters of ``download`` (replace, mirror_dir...)
+
+    Returns:
+        The {filename: path} of the downloaded files
+    """
+    data_dir = Path(data_dir)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(
+                download, url, data_dir / name, sha256=sha256, **kwargs
+            )
+            for name, (url, sha256) in sources.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def file_hash(path, cache_dir=CACHE_DIR):
+    """Return the sha256 of a file.
+
+    Hashes are remembered with the size and modification time of the file, so
+    large inputs are only hashed again when they change.
+    """
+    path = Path(path)
+    hashes_path = Path(cache_dir) / "file_hashes.json"
+    stat = path.stat()
+    signature = [stat.st_size, stat.st_mtime_ns]
+    with _file_hashes_lock:  # Sources can be checked from several threads
+        hashes = _read_file_hashes(hashes_path)
+    known = hashes.get(str(path.resolve()))
+    if known and known[:2] == signature:
+        return known[2]
+    digest = _sha256(path)
+    with _file_hashes_lock:
+        hashes = _read_file_hashes(hashes_path)
+        hashes[str(path.resolve())] = signature + [digest]
+        hashes_path.parent.mkdir(parents=True, exist_ok=True)
+        hashes_path.write_text(json.dumps(hashes, indent=2))
+    return digest
+
+
+def _read_file_hashes(hashes_path):
+    return json.loads(hashes_path.read_text()) if hashes_path.exists() else {}
+
+
+def cached_stage(name, inputs, build, cache_dir=CACHE_DIR, stages=()):
+    """Return ``build()``, computed once per version of the inputs.
+
+    The result is pickled under ``data/cache``, keyed by the hashes of the
+    input files and the source code of ``build``: changing a data file or the
+    filters of a stage rebuilds that stage only.
+
+    A stage using the results of other stages lists them in ``stages``. They
+    must have run before (not from within ``build``), and their keys are part
+    of its key, so it is rebuilt when they are.
+
+    Args:
+        name: Name of the stage, e.g. "en_nouns"
+        inputs: Paths of the files the stage reads
+        build: Function without arguments computing the stage's result
+        cache_dir: Directory of the cached results
+        stages: Names of the stages whose results ``build`` uses
+    """
+    key = hashlib.sha256(inspect.getsource(build).encode())
+    for path in inputs:
+        key.update(file_hash(path, cache_dir).encode())
+    for stage in stages:
+        if stage not in _stage_keys:
+            raise ValueError(f"Stage {name} uses stage {stage}, which hasn't run")
+        key.update(_stage_keys[stage].encode())
+    _stage_keys[name] = key.hexdigest()
+    cache_path = Path(cache_dir) / f"{name}-{key.hexdigest()[:16]}.pickle"
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    print(f"Building {name}")
+    result = build()
+    for old_path in Path(cache_dir).glob(f"{name}-*.pickle"):
+        old_path.unlink()
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(result, f)
+    os.replace(tmp_path, cache_path)
+    return result